@@ -0,0 +1,53 @@
+"""Micro-benchmarks for the geometry primitives in zellij.euclid."""
+
+from collections import namedtuple
+import random
+import timeit
+
+from zellij.euclid import Point, Segment
+
+
+class SortedSegment(namedtuple('SortedSegment', 'p1 p2')):
+    """The old Segment, which sorted its endpoints on every hash and compare."""
+
+    def __eq__(self, other):
+        return sorted(self) == sorted(other)
+
+    def __hash__(self):
+        return hash(tuple(sorted(self)))
+
+
+def random_points(n, seed=17):
+    rand = random.Random(seed)
+    return [Point(rand.uniform(-1000, 1000), rand.uniform(-1000, 1000)) for _ in range(n)]
+
+
+def seg_dict_ops(seg_class, points):
+    """Mimic strapify: build a dict of segments, then look them all up backwards."""
+    segs = [seg_class(p1, p2) for p1, p2 in zip(points, points[1:])]
+    segs_to_paths = {}
+    for seg in segs:
+        segs_to_paths[seg] = seg
+    for p1, p2 in zip(points, points[1:]):
+        segs_to_paths.get(seg_class(p2, p1))
+
+
+def bench(label, stmt, number):
+    secs = min(timeit.repeat(stmt, number=number, repeat=5)) / number
+    print(f"{label:>40}: {secs * 1e3:8.3f} ms")
+    return secs
+
+
+def main():
+    points = random_points(20000)
+    old = bench("namedtuple Segment, sorted() hashing", lambda: seg_dict_ops(SortedSegment, points), 5)
+    new = bench("slotted Segment, cached hash", lambda: seg_dict_ops(Segment, points), 5)
+    print(f"{'speedup':>40}: {old / new:8.2f}x")
+
+    p1, p2 = points[:2]
+    bench("Point.distance x 100k", lambda: [p1.distance(p2) for _ in range(100000)], 5)
+    bench("Point.is_close x 100k", lambda: [p1.is_close(p2) for _ in range(100000)], 5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Compare float coordinates with grid-snapped coordinates on the bundled designs.
+
+Usage:
+    python bin/bench_grid.py [SIZE [GRID]]
+
+"""
+
+import sys
+import timeit
+
+from zellij.design import get_design
+from zellij.euclid import Bounds
+from zellij.path import Path, combine_paths
+from zellij.path_tiler import PathTiler
+
+DESIGNS = ["breath", "cards", "threestars"]
+
+
+class PlainDrawing:
+    """Just enough of a Drawing for PathTiler."""
+    def __init__(self, width, height):
+        self.bounds = Bounds(0, 0, width, height)
+
+    def perimeter(self):
+        return Path(self.bounds.corners())
+
+
+def tile_and_combine(design, size, grid):
+    tilew = size // 3
+    tiler = PathTiler(PlainDrawing(size, size), grid=grid and tilew * grid)
+    get_design(design)(tilew).draw(tiler)
+    return combine_paths(tiler.paths)
+
+
+def main(size, grid):
+    print(f"size={size}, grid={grid} of a tile width")
+    for design in DESIGNS:
+        times = {}
+        for label, g in [("float", 0), ("grid", grid)]:
+            times[label] = min(timeit.repeat(lambda: tile_and_combine(design, size, g), number=1, repeat=5))
+        npaths = len(tile_and_combine(design, size, grid))
+        print(
+            f"{design:>12}: {npaths:5d} paths, "
+            f"float {times['float'] * 1e3:8.1f} ms, grid {times['grid'] * 1e3:8.1f} ms, "
+            f"{times['float'] / times['grid']:5.2f}x"
+        )
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    size = int(args[0]) if len(args) > 0 else 800
+    grid = float(args[1]) if len(args) > 1 else 1e-10
+    main(size, grid)
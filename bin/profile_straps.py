@@ -0,0 +1,40 @@
+"""Profile a `zellij straps` run, and show where the time goes.
+
+Usage:
+    python bin/profile_straps.py threestars --tiles=6 --size=2000 --format=svg
+
+Any arguments are passed to `zellij straps`.  SVG output keeps the drawing
+time small, so the geometry stands out.  The report lists the busiest
+functions, and then the call counts of every function in zellij/path.py and
+zellij/euclid.py, one per line, to diff against another revision and see how
+much geometry is recomputed.
+
+"""
+
+import cProfile
+import pstats
+import sys
+
+from zellij.cmd import clickmain
+
+
+def geometry_calls(stats):
+    """Produce (ncalls, "file:function") for zellij/path.py and zellij/euclid.py."""
+    for (filename, line, funcname), (_, ncalls, _, _, _) in stats.stats.items():
+        if filename.endswith(("path.py", "euclid.py")):
+            yield ncalls, f"{filename.rpartition('/')[2]}:{line}:{funcname}"
+
+
+def main(args):
+    prof = cProfile.Profile()
+    try:
+        prof.runcall(clickmain, ["straps", *args], standalone_mode=False)
+    finally:
+        stats = pstats.Stats(prof)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(25)
+        for ncalls, name in sorted(geometry_calls(stats), reverse=True):
+            print(f"{ncalls:10d}  {name}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
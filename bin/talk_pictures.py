@@ -31,7 +31,7 @@ def draw_it(tilew, dwg, combined=True, fat=True, color=(0, 0, 0), line_width=2,
         ]
     else:
         styles = [(line_width, color)]
-    dwg.multi_stroke(paths, styles)
+    dwg.multi_stroke(paths, styles, period=tiler.period)
 
 
 DWGW = 800
@@ -0,0 +1,31 @@
+"""Test zellij/bands.py"""
+
+import pytest
+
+from zellij.bands import BandedDrawing
+from zellij.euclid import Point
+
+
+def test_bands():
+    dwg = BandedDrawing(100, 2500, name="test.png", band_height=1000)
+    assert list(dwg.bands()) == [(0, 1000), (1000, 2000), (2000, 2500)]
+
+
+def test_transform():
+    dwg = BandedDrawing(100, 200, name="test.png")
+    dwg.translate(50, 100)
+    dwg.rotate(90)
+    assert dwg.device_to_user_length(10) == pytest.approx(10)
+    corners = dwg.perimeter().points
+    assert corners[0].is_close(Point(-100, 50))
+    assert corners[2].is_close(Point(100, -50))
+
+
+@pytest.mark.parametrize("kwargs", [
+    dict(name="test.svg"),
+    dict(name="test.png", bg=()),
+    dict(name="test.png", bg=(1, 1, 1, .5)),
+])
+def test_bad_drawings(kwargs):
+    with pytest.raises(ValueError):
+        BandedDrawing(100, 100, **kwargs)
@@ -2,9 +2,13 @@
 Test zellij/drawing.py
 """
 
+import xml.etree.ElementTree as ET
+
 import pytest
 
-from zellij.drawing import name_and_format
+from zellij.drawing import Drawing, DrawingSequence, coord_fixer, fix_points, name_and_format, periodic_copies
+from zellij.euclid import Point
+from zellij.path import Dot, Path
 
 
 @pytest.mark.parametrize("name_in, format_in, name_out, format_out", [
@@ -15,8 +19,136 @@ from zellij.drawing import name_and_format
     ('foo', 'svg', 'foo.svg', 'svg'),
     ('dir/foo.svg', None, 'dir/foo.svg', 'svg'),
     ('dir/foo', None, 'dir/foo.png', 'png'),
+    ('foo.svgz', None, 'foo.svgz', 'svgz'),
+    ('foo', 'rgba', 'foo.rgba', 'rgba'),
+    (None, None, None, 'png'),
+    (None, 'raw', None, 'raw'),
 ])
 def test_name_and_format(name_in, format_in, name_out, format_out):
     name_act, format_act = name_and_format(name_in, format_in)
     assert name_act == name_out
     assert format_act == format_out
+
+
+@pytest.mark.parametrize("width, v, fixed", [
+    (1, 10.2, 10.5),
+    (1, 10.7, 10.5),
+    (3, -0.2, -0.5),
+    (2, 10.2, 10),
+    (2, 10.7, 11),
+    (0.5, 10.2, 10.25),
+    (0.5, 10.6, 10.75),
+])
+def test_coord_fixer(width, v, fixed):
+    assert coord_fixer(width)(v) == fixed
+
+
+@pytest.mark.parametrize("matrix, width, points, fixed", [
+    ((1, 0, 0, 1, 0, 0), 1, [(10.2, 3.9)], [(10.5, 3.5)]),
+    ((1, 0, 0, 1, 0.25, 0), 2, [(10.2, 3.9)], [(9.75, 4)]),
+    # Scaled by 10, and flipped vertically.
+    ((10, 0, 0, -10, 0, 100), 1, [(1.02, 3.91), (0, 0)], [(1.05, 3.95), (0.05, -0.05)]),
+])
+def test_fix_points(matrix, width, points, fixed):
+    assert fix_points(points, matrix, width) == pytest.approx(fixed)
+
+
+@pytest.mark.parametrize("matrix, period, origin", [
+    ((1, 0, 0, 1, 0, 0), (100, 50), (0, 0)),
+    ((1, 0, 0, 1, 0, 0), (173.2, 300), (400.1, 399.7)),
+    ((2.5, 0, 0, -2.5, 10, 790), (69.28, 120), (151, 152)),
+])
+def test_periodic_copies(matrix, period, origin):
+    # The copies cover every pixel of the canvas exactly once, and each is
+    # placed within half a phase of where it belongs.
+    size = (800, 800)
+    phases = 4
+    covered = [[0] * size[0] for _ in range(size[1])]
+    xx, _, _, yy, x0, y0 = matrix
+    for (qx, qy), (px, py), (lo_x, lo_y, hi_x, hi_y) in periodic_copies(matrix, period, origin, size, phases):
+        assert 0 <= qx < phases and 0 <= qy < phases
+        for y in range(lo_y, hi_y):
+            for x in range(lo_x, hi_x):
+                covered[y][x] += 1
+        # The copy is a whole number of periods from the origin.
+        for pixel, phase, scale, offset, start, step in [(px, qx, xx, x0, origin[0], period[0]), (py, qy, yy, y0, origin[1], period[1])]:
+            n = round(((pixel - offset) / scale - start) / step)
+            assert pixel + phase / phases == pytest.approx(scale * (start + n * step) + offset, abs=0.5 / phases)
+    assert all(c == 1 for row in covered for c in row)
+
+
+def test_svg_drawing(tmp_path):
+    # SVG is written without Cairo, and without snapping.
+    name = str(tmp_path / "test.svg")
+    dwg = Drawing(100, 50, name=name, bg=(1, 0, 0), precision=1)
+    assert not dwg.snap
+    dwg.translate(10, 10)
+    dwg.draw_paths([Path([Point(0, 0), Point(20.25, 0), Point(20.25, 20.25), Point(0, 0)])], width=3)
+    dwg.finish()
+    paths = ET.parse(name).getroot().findall("{http://www.w3.org/2000/svg}path")
+    assert [p.get("d") for p in paths] == ["M0 0L100 0L100 50L0 50Z", "M10 10L30.2 10L30.2 30.2Z"]
+    assert paths[0].get("fill") == "#ff0000"
+    assert paths[1].get("stroke-width") == "3"
+
+
+def test_drawing_sequence(tmp_path):
+    seq = DrawingSequence(str(tmp_path / "frame_.svg"), 20, 10, workers=2, pending=2)
+    for _, dwg in zip(range(5), seq):
+        dwg.draw_paths([Path([Point(0, 0), Point(dwg.num, 5)])])
+        dwg.finish()
+    seq.close()
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert names == [f"frame_{num:04d}.svg" for num in range(5)]
+    for num in range(5):
+        paths = ET.parse(tmp_path / names[num]).getroot().findall("{http://www.w3.org/2000/svg}path")
+        assert paths[-1].get("d") == f"M0 0L{num} 5"
+
+
+def test_sequence_background(tmp_path):
+    # The background is drawn once, and painted onto every frame.
+    calls = []
+    def background(dwg):
+        calls.append(dwg)
+        dwg.draw_paths([Path([Point(1, 1), Point(9, 1)])], width=2)
+
+    seq = DrawingSequence(str(tmp_path / "frame_.svg"), 20, 10, background=background)
+    for _, dwg in zip(range(3), seq):
+        dwg.translate(5, 0)
+        dwg.draw_paths([Path([Point(0, 0), Point(dwg.num, 5)])])
+        dwg.finish()
+    seq.close()
+    assert len(calls) == 1
+    for num in range(3):
+        root = ET.parse(tmp_path / f"frame_{num:04d}.svg").getroot()
+        paths = root.findall("{http://www.w3.org/2000/svg}path")
+        assert [p.get("d") for p in paths[1:]] == ["M1 1L9 1", f"M5 0L{num + 5} 5"]
+        assert paths[1].get("stroke-width") == "2"
+
+
+def test_visible_paths(tmp_path):
+    dwg = Drawing(100, 50, name=str(tmp_path / "test.svg"), lod=2)
+    dwg.scale(10, 10)
+    on = Path([Point(1, 1), Point(5, 1)])
+    near = Path([Point(-2, 1), Point(-1, 1)])
+    off = Path([Point(20, 1), Point(30, 1)])
+    tiny = Path([Point(2, 2), Point(2.1, 2.1)])
+    tiny_too = Path([Point(2.05, 2.05), Point(2.1, 2.05)])
+    visible = dwg.visible_paths([on, near, off, tiny, tiny_too], width=0.5)
+    assert visible[:2] == [on, near]
+    assert visible[2:] == [Dot(Point(2.05, 2.05))]
+    # The dot is an open zero-length segment.
+    assert not visible[2].closed
+    dwg.lod = 0
+    assert dwg.visible_paths([on, off, tiny, tiny_too], width=0.5) == [on, tiny, tiny_too]
+
+    # The default is to draw every path.
+    assert Drawing(100, 50, name=str(tmp_path / "test2.svg")).lod == 0
+
+
+def test_dot_in_svg(tmp_path):
+    svg = tmp_path / "test.svg"
+    dwg = Drawing(100, 50, name=str(svg), lod=2)
+    dwg.scale(10, 10)
+    dwg.draw_paths([Path([Point(2, 2), Point(2.1, 2.1)])], width=0.5, rgb=(0, 0, 0))
+    dwg.finish()
+    assert '<path d="M20.5 20.5L20.5 20.5" ' in svg.read_text()
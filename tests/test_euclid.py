@@ -13,6 +13,7 @@ from zellij.euclid import (
     Line, Point, Segment, Bounds, EmptyBounds,
     along_the_way, collinear, line_collinear,
     CoincidentLines, ParallelLines,
+    INTERSECTING, PARALLEL, COINCIDENT, DISJOINT,
 )
 from zellij.postulates import adjacent_pairs, all_pairs
 
@@ -58,6 +59,23 @@ def test_point_distance(p1, p2, result):
 def test_points_collinear(p1, p2, p3, result):
     assert collinear(Point(*p1), Point(*p2), Point(*p3)) == result
 
+SCALES = [1e-6, 1, 1e6, 1e12]
+
+@pytest.mark.parametrize("scale", SCALES)
+@pytest.mark.parametrize("p1, p2, p3, result", [
+    ((0, 0), (1, 1), (10, 10), True),
+    ((0, 0), (10, 10), (1, 1), False),
+    ((0, 0), (1, 1), (100, 200), False),
+    ((0, 0), (1, 1), (1000000, 1000001), False),
+    ((0, 0), (0, 3), (0, 7), True),
+    ((0, 0), (0, 3), (0, -7), False),
+    ((2, 1), (4, 2), (6, 3), True),
+])
+def test_points_collinear_scaled(scale, p1, p2, p3, result):
+    # The answer is the same no matter how big or small the drawing is.
+    pts = [Point(x * scale, y * scale) for x, y in (p1, p2, p3)]
+    assert collinear(*pts) == result
+
 
 @given(ipoints, ipoints, t_zero_one)
 def test_hypo_points_collinear(p1, p2, t):
@@ -131,6 +149,43 @@ def test_no_intersection(p1, p2, p3, p4, err):
         l1.intersect(l2)
 
 
+@pytest.mark.parametrize("p1, p2, p3, p4, status", [
+    ((-1, 0), (1, 0),  (0, -1), (0, 1),  INTERSECTING),
+    ((-1, 0), (1, 0),  (-2, 0), (2, 0),  COINCIDENT),
+    ((-1, 0), (1, 0),  (-2, 1), (2, 1),  PARALLEL),
+])
+def test_line_intersect_status(p1, p2, p3, p4, status):
+    l1 = Line(Point(*p1), Point(*p2))
+    l2 = Line(Point(*p3), Point(*p4))
+    act_status, pt = l1.intersect_status(l2)
+    assert act_status == status
+    assert (pt is None) == (status != INTERSECTING)
+
+@pytest.mark.parametrize("scale", SCALES)
+@pytest.mark.parametrize("p1, p2, p3, p4, status", [
+    ((-1, 0), (1, 0),  (0, -1), (0, 1),  INTERSECTING),
+    ((-1, 0), (1, 0),  (-2, 0), (2, 0),  COINCIDENT),
+    ((-1, 0), (1, 0),  (-2, 1), (2, 1),  PARALLEL),
+    ((0, 0), (1, 3),  (2, 6), (5, 15),  COINCIDENT),
+    ((0, 0), (1, 3),  (1, 0), (2, 3),  PARALLEL),
+    ((0, 0), (1, 3),  (0, 1), (1, 3),  INTERSECTING),
+])
+def test_line_intersect_status_scaled(scale, p1, p2, p3, p4, status):
+    l1 = Line(Point(p1[0] * scale, p1[1] * scale), Point(p2[0] * scale, p2[1] * scale))
+    l2 = Line(Point(p3[0] * scale, p3[1] * scale), Point(p4[0] * scale, p4[1] * scale))
+    assert l1.intersect_status(l2)[0] == status
+
+
+@pytest.mark.parametrize("p1, p2, pt, side", [
+    ((0, 0), (10, 0), (5, 1), 1),
+    ((0, 0), (10, 0), (5, -1), -1),
+    ((0, 0), (10, 0), (50, 0), 0),
+    ((0, 0), (10, 10), (12, 12.000000000000002), 1),
+])
+def test_line_side(p1, p2, pt, side):
+    assert Line(Point(*p1), Point(*p2)).side(pt) == side
+
+
 def test_offset():
     l1 = Line(Point(10, 10), Point(13, 14))
     l2 = l1.offset(10)
@@ -172,6 +227,43 @@ def test_perpendicular(p1, p2, p3):
 
 # Segments
 
+@given(ipoints, ipoints)
+def test_segment_equality(p1, p2):
+    # Property: segments are equal and hash the same in either direction.
+    seg12 = Segment(p1, p2)
+    seg21 = Segment(p2, p1)
+    assert seg12 == seg21
+    assert hash(seg12) == hash(seg21)
+    assert {seg12: 1}[seg21] == 1
+
+    # Property: the endpoints stay in the order they were given.
+    assert seg21.p1 == p2
+    assert list(seg21) == [p2, p1]
+
+@pytest.mark.parametrize("seg1, seg2, result", [
+    (((0, 0), (1, 1)), ((0, 0), (1, 1)), True),
+    (((0, 0), (1, 1)), ((1, 1), (0, 0)), True),
+    (((0, 0), (1, 1)), ((0, 0), (1, 2)), False),
+    ((Point(0, 0), Point(1, 1)), ((1, 1), (0, 0)), True),
+])
+def test_segment_equal(seg1, seg2, result):
+    assert (Segment(*seg1) == Segment(*seg2)) == result
+    # Segments compare to pairs of points too, as they did as namedtuples.
+    assert (Segment(*seg1) == seg2) == result
+    assert (seg2 == Segment(*seg1)) == result
+    assert (Segment(*seg1) == list(seg2)) == result
+    assert (Segment(*seg1) != seg2) != result
+
+def test_segment_not_equal_to_other_things():
+    assert Segment((0, 0), (1, 1)) != ((0, 0), (1, 1), (2, 2))
+    assert Segment((0, 0), (1, 1)) != "ab"
+
+def test_compact_primitives():
+    # The primitives are made in huge numbers: they shouldn't carry a __dict__.
+    for obj in [Point(1, 2), Line(Point(1, 2), Point(3, 4)), Segment((1, 2), (3, 4)), Bounds(1, 2, 3, 4)]:
+        assert not hasattr(obj, "__dict__")
+
+
 SEGMENT_INTERSECTIONS = [
     # Good intersection.
     ((0, 1), (2, 1),  (1, 0), (1, 2),  (1, 1)),
@@ -183,6 +275,7 @@ SEGMENT_INTERSECTIONS = [
     ((0, 1), (2, 1),  (1, 3), (3, 3),  None),
     # lines are coincident, segments don't overlap.
     ((0, 1), (2, 1),  (3, 1), (5, 1),  None),
+    ((1, 0), (1, 2),  (1, 3), (1, 5),  None),
 ]
 
 @pytest.mark.parametrize("p1, p2, p3, p4, isect", SEGMENT_INTERSECTIONS)
@@ -200,6 +293,30 @@ def test_segment_touches(p1, p2, p3, p4, isect):
     else:
         assert seg12.touches(seg34)
 
+@pytest.mark.parametrize("p1, p2, p3, p4, isect", SEGMENT_INTERSECTIONS)
+def test_segment_intersect_status(p1, p2, p3, p4, isect):
+    status, pt = Segment(p1, p2).intersect_status(Segment(p3, p4))
+    assert status == (DISJOINT if isect is None else INTERSECTING)
+    assert pt == isect
+
+@pytest.mark.parametrize("scale", SCALES)
+@pytest.mark.parametrize("p1, p2, p3, p4, isect", SEGMENT_INTERSECTIONS + [
+    # Segments touching end to end, or end to middle.
+    ((0, 0), (2, 2),  (2, 2), (4, 0),  (2, 2)),
+    ((0, 0), (4, 0),  (2, 0), (2, 3),  (2, 0)),
+    # Nearly touching.
+    ((0, 0), (4, 0),  (2, 1e-6), (2, 3),  None),
+])
+def test_segment_intersect_status_scaled(scale, p1, p2, p3, p4, isect):
+    s12 = Segment((p1[0] * scale, p1[1] * scale), (p2[0] * scale, p2[1] * scale))
+    s34 = Segment((p3[0] * scale, p3[1] * scale), (p4[0] * scale, p4[1] * scale))
+    status, pt = s12.intersect_status(s34)
+    if isect is None:
+        assert status == DISJOINT
+    else:
+        assert status == INTERSECTING
+        assert pt.is_close(Point(isect[0] * scale, isect[1] * scale))
+
 
 SEGMENT_INTERSECTION_ERRORS = [
     # lines are coincident, segments do overlap.
@@ -207,6 +324,21 @@ SEGMENT_INTERSECTION_ERRORS = [
     ((1, -5), (-1, -5), (-5, -5), (0, -5),  CoincidentLines),
 ]
 
+@pytest.mark.parametrize("p1, p2, p3, p4, isect", [
+    # A tiny segment crossing a long one, nearly parallel to it.
+    ((0, 0), (1000, 0),  (500, 1e-7), (500.000001, -1e-7),  (500.0000005, 0)),
+    ((0, 0), (1000, 0),  (500, 1e-300), (500, -1e-300),  (500, 0)),
+    # A zero-length segment is only on segments it touches.
+    ((1, 1), (1, 1),  (1, 3), (0, 1),  None),
+])
+def test_segment_intersect_tiny(p1, p2, p3, p4, isect):
+    pt = Segment(p1, p2).intersect(Segment(p3, p4))
+    if isect is None:
+        assert pt is None
+    else:
+        assert pt.is_close(Point(*isect))
+
+
 @pytest.mark.parametrize("p1, p2, p3, p4, err", SEGMENT_INTERSECTION_ERRORS)
 def test_segment_intersect_error(p1, p2, p3, p4, err):
     with pytest.raises(err):
@@ -217,6 +349,21 @@ def test_segment_touches_errors(p1, p2, p3, p4, err):
     assert err == CoincidentLines   # ick
     assert Segment(p1, p2).touches(Segment(p3, p4))
 
+@pytest.mark.parametrize("p1, p2, p3, p4, err", SEGMENT_INTERSECTION_ERRORS)
+def test_segment_intersect_status_coincident(p1, p2, p3, p4, err):
+    assert Segment(p1, p2).intersect_status(Segment(p3, p4)) == (COINCIDENT, None)
+
+
+@pytest.mark.parametrize("p1, p2, pt, dist", [
+    ((0, 0), (10, 0), (5, 3), 3),
+    ((0, 0), (10, 0), (-3, 4), 5),
+    ((0, 0), (10, 0), (13, -4), 5),
+    ((0, 0), (10, 0), (7, 0), 0),
+    ((2, 2), (2, 2), (5, 6), 5),
+])
+def test_segment_distance(p1, p2, pt, dist):
+    assert math.isclose(Segment(p1, p2).distance(pt), dist)
+
 
 @given(ipoints, ipoints, lists(integers(min_value=1, max_value=99), min_size=1, max_size=5, unique=True))
 def test_segment_sort_along(p1, p2, tvals):
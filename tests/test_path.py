@@ -2,9 +2,14 @@
 
 import collections
 import math
+import pickle
 
-from zellij.euclid import Point
-from zellij.path import Path, combine_paths, equal_path, equal_paths, paths_length
+from zellij.euclid import Bounds, Line, Point
+from zellij.postulates import adjacent_pairs
+from zellij.path import (
+    Path, clip_paths, combine_paths, dedupe_paths, equal_path, equal_paths,
+    merge_overlaps, offset_paths, paths_length, simplify_paths,
+)
 
 from hypothesis import given
 from hypothesis.strategies import lists, randoms, composite, one_of
@@ -91,6 +96,220 @@ def test_any_collinear(points, result):
     assert Path(points).any_collinear() == result
 
 
+@given(lists(ipoints, min_size=2, max_size=12), randoms())
+def test_canonicalize_loop(points, rand):
+    loop = points + points[:1]
+    path = Path(loop)
+    canonical = path.canonicalize()
+
+    # Property: it's the least of all the rotations in both directions.
+    pts = points
+    brute = min((pts[i:] + pts[:i])[::s] for i in range(len(pts)) for s in [1, -1])
+    assert canonical == Path(brute + brute[:1])
+
+    # Property: any rotation or reversal has the same canonical form.
+    i = rand.randrange(len(points))
+    rotated = points[i:] + points[:i]
+    if rand.random() > .5:
+        rotated = rotated[::-1]
+    assert Path(rotated + rotated[:1]).canonicalize() == canonical
+
+
+def test_dedupe_paths():
+    paths = [
+        Path([P(11), P(22)]),
+        Path([P(11), P(20), P(33), P(11)]),
+        Path([P(22), P(11)]),
+        Path([P(33), P(11), P(20), P(33)]),
+        Path([P(11), P(33), P(20), P(11)]),
+        Path([P(11), P(33)]),
+    ]
+    assert dedupe_paths(paths) == [paths[0], paths[1], paths[5]]
+
+
+@pytest.mark.parametrize("paths, result", [
+    # No overlaps: nothing changes.
+    ([[P(11), P(15)], [P(15), P(19)], [P(11), P(55)]],
+        [[P(11), P(15)], [P(15), P(19)], [P(11), P(55)]]),
+    # The same segment twice, in either direction.
+    ([[P(11), P(15)], [P(15), P(11)]], [[P(11), P(15)]]),
+    # Partial overlap.
+    ([[P(11), P(16)], [P(14), P(19)]], [[P(11), P(14), P(16), P(19)]]),
+    ([[P(11), P(51)], [P(61), P(31)], [P(91), P(71)]],
+        [[P(11), P(31), P(51), P(61)], [P(91), P(71)]]),
+    # One inside the other.
+    ([[P(11), P(88)], [P(44), P(33)]], [[P(11), P(33), P(44), P(88)]]),
+    # Overlapping segments in the middle of longer paths: the split paths
+    # still meet the merged span at P(13) and P(14).
+    ([[P(0), P(11), P(14), P(4)], [P(60), P(13), P(17), P(70)]],
+        [[P(0), P(11)], [P(14), P(4)], [P(60), P(13)], [P(17), P(70)], [P(11), P(13), P(14), P(17)]]),
+])
+def test_merge_overlaps(paths, result):
+    merged = merge_overlaps([Path(p) for p in paths])
+    assert equal_paths(merged, [Path(r) for r in result])
+    # Every original point is still a point of some path.
+    points = {pt for path in merged for pt in path}
+    assert all(pt in points for path in paths for pt in path)
+
+
+def test_merge_overlaps_fuzz():
+    paths = [
+        Path([Point(0, 0), Point(10, 10)]),
+        Path([Point(5.0000000001, 5), Point(15, 15.0000000001)]),
+    ]
+    merged = merge_overlaps(paths)
+    assert equal_paths(merged, [Path([
+        Point(0, 0), Point(5.0000000001, 5), Point(10, 10), Point(15, 15.0000000001),
+    ])])
+
+
+@pytest.mark.parametrize("points, tolerance, result", [
+    # Nothing to remove.
+    ([P(11), P(55), P(19)], 0.5, [P(11), P(55), P(19)]),
+    # A wiggle smaller than the tolerance.
+    ([Point(0, 0), Point(5, 0.2), Point(10, 0)], 0.5, [Point(0, 0), Point(10, 0)]),
+    ([Point(0, 0), Point(5, 0.2), Point(10, 0)], 0.1, [Point(0, 0), Point(5, 0.2), Point(10, 0)]),
+    ([Point(0, 0), Point(3, 0.2), Point(5, 3), Point(7, -0.2), Point(10, 0)], 0.5,
+        [Point(0, 0), Point(3, 0.2), Point(5, 3), Point(7, -0.2), Point(10, 0)]),
+    ([Point(0, 0), Point(2, 0.1), Point(4, 3), Point(6, 3.1), Point(8, 3)], 0.5,
+        [Point(0, 0), Point(2, 0.1), Point(4, 3), Point(8, 3)]),
+    # A loop keeps its shape.
+    ([P(0), Point(5, 0.1), P(90), P(99), P(9), P(0)], 0.5, [P(0), P(90), P(99), P(9), P(0)]),
+    ([P(0), Point(5, 0.1), P(90), P(0)], 0.5, [P(0), Point(5, 0.1), P(90), P(0)]),
+])
+def test_simplify(points, tolerance, result):
+    assert Path(points).simplify(tolerance) == Path(result)
+
+
+@given(lists(ipoints, min_size=2, max_size=30))
+def test_hypo_simplify(points):
+    path = Path(points)
+    simple, = simplify_paths([path], 5)
+    # Property: the ends are the same, and every original point is close to
+    # the simplified path.
+    assert simple[0] == path[0]
+    assert simple[-1] == path[-1]
+    assert len(simple) <= len(path)
+    segs = simple.segments()
+    for pt in path:
+        assert min(seg.distance(pt) for seg in segs) <= 5 + 1e-6
+
+
+def offset_by_lines(path, offset):
+    """Offset a path by intersecting offset Lines, the slow way."""
+    lines = [Line(p1, p2).offset(offset) for p1, p2 in adjacent_pairs(path.points)]
+    if path.closed:
+        lines = lines[-1:] + lines + lines[:1]
+        points = []
+    else:
+        points = [lines[0].p1]
+    points.extend(l1.intersect(l2) for l1, l2 in adjacent_pairs(lines))
+    if not path.closed:
+        points.append(lines[-1].p2)
+    return Path(points)
+
+@pytest.mark.parametrize("points", [
+    [P(11), P(15), P(55)],
+    [P(0), P(90), P(99), P(9), P(0)],
+    [P(0), P(9), P(90), P(0)],
+    [P(11), P(23), P(71), P(84), P(92)],
+])
+@pytest.mark.parametrize("offset", [1, -1, 0.25])
+def test_offset_path(points, offset):
+    path = Path(points)
+    actual = path.offset_path(offset)
+    expected = offset_by_lines(path, offset)
+    assert len(actual) == len(expected)
+    assert all(a.is_close(e) for a, e in zip(actual, expected))
+    assert actual.closed == path.closed
+
+
+@pytest.mark.parametrize("points, result", [
+    # Straight through: the old way raised CoincidentLines.
+    ([P(0), P(10), P(20)], [Point(0, -1), Point(1, -1), Point(2, -1)]),
+    # Nearly straight.
+    ([P(0), Point(1, 1e-12), P(20)], [Point(0, -1), Point(1, -1), Point(2, -1)]),
+    # Doubling back.
+    ([P(0), P(20), P(10)], [Point(0, -1), Point(2, -1), Point(1, 1)]),
+])
+def test_offset_path_parallel(points, result):
+    actual, = offset_paths([Path(points)], 1)
+    assert all(a.is_close(r) for a, r in zip(actual, result))
+
+
+def test_cached_properties():
+    path = Path([P(11), P(14), P(54), P(11)])
+    # The derived values are computed once, then reused.
+    assert path.bounds() is path.bounds()
+    assert path.segments() is path.segments()
+    assert path.canonicalize() is path.canonicalize()
+    assert path.canonicalize().canonicalize() is path.canonicalize()
+    assert path.length() == 12
+    assert path.closed
+    assert not hasattr(path, "__dict__")
+
+
+@given(lists(ipoints, min_size=2, max_size=20))
+def test_pickled_path(points):
+    path = Path(points)
+    path.bounds()
+    path2 = pickle.loads(pickle.dumps(path))
+    assert path2 == path
+    assert hash(path2) == hash(path)
+    assert path2.bounds() == path.bounds()
+
+
+CLIP_BOUNDS = Bounds(0, 0, 10, 10)
+# The same square, as a rotated perimeter would be: clockwise, not closed.
+CLIP_PERIMETER = Path([Point(0, 0), Point(0, 10), Point(10, 10), Point(10, 0)])
+# A diamond.
+CLIP_DIAMOND = Path([Point(5, 0), Point(10, 5), Point(5, 10), Point(0, 5), Point(5, 0)])
+
+@pytest.mark.parametrize("clip", [CLIP_BOUNDS, CLIP_PERIMETER])
+@pytest.mark.parametrize("path, result", [
+    # Entirely inside.
+    ([P(11), P(55), P(19)], [[P(11), P(55), P(19)]]),
+    # Entirely outside, though the bounds overlap.
+    ([Point(-5, 5), Point(5, -5)], []),
+    # Crossing the edge.
+    ([Point(5, 5), Point(15, 5)], [[Point(5, 5), Point(10, 5)]]),
+    ([Point(-5, 5), Point(15, 5), Point(15, 6)], [[Point(0, 5), Point(10, 5)]]),
+    # In and out twice.
+    ([Point(2, -2), Point(2, 2), Point(8, 2), Point(8, -2)], [[Point(2, 0), Point(2, 2), Point(8, 2), Point(8, 0)]]),
+    ([Point(2, 5), Point(-2, 5), Point(-2, 8), Point(2, 8)], [[Point(2, 5), Point(0, 5)], [Point(0, 8), Point(2, 8)]]),
+    # A loop around a corner, starting inside.
+    ([P(11), Point(-1, 1), Point(-1, -1), Point(1, -1), P(11)], [[Point(0, 1), P(11), Point(1, 0)]]),
+])
+def test_clip_paths(clip, path, result):
+    clipped = clip_paths([Path(path)], clip)
+    assert equal_paths(clipped, [Path(r) for r in result])
+
+
+def test_clip_paths_diamond():
+    path = Path([Point(-5, 5), Point(15, 5)])
+    assert clip_paths([path], CLIP_DIAMOND) == [Path([Point(0, 5), Point(10, 5)])]
+    clipped = clip_paths([path], CLIP_DIAMOND, margin=2**.5)
+    assert equal_paths(clipped, [Path([Point(-2, 5), Point(12, 5)])])
+
+
+def test_clip_paths_margin():
+    path = Path([Point(-5, 5), Point(15, 5)])
+    clipped = clip_paths([path], CLIP_BOUNDS, margin=1)
+    assert clipped == [Path([Point(-1, 5), Point(11, 5)])]
+
+
+@given(lists(ipoints, min_size=2, max_size=10))
+def test_hypo_clip_paths(points):
+    path = Path(points)
+    clipped = clip_paths([path], Bounds(-1000, -2000, 3000, 1000))
+    # Property: what's left is inside the clip, and no longer than the path.
+    for cpath in clipped:
+        for x, y in cpath:
+            assert -1000 - 1e-6 <= x <= 3000 + 1e-6
+            assert -2000 - 1e-6 <= y <= 1000 + 1e-6
+    assert paths_length(clipped) <= path.length() + 1e-6
+
+
 def point_set(paths):
     """The set of points in all these paths."""
     return set(pt for path in paths for pt in path)
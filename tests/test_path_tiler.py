@@ -1,8 +1,12 @@
 """Test path_tiler.py"""
 
-from zellij.euclid import Point
-from zellij.path_tiler import PathCanvas, square_to_parallelogram
-from zellij.path import Path
+import math
+
+from zellij.design import get_design
+from zellij.euclid import Bounds, Point
+from zellij.path_tiler import PathCanvas, PathTiler, rectangular_period, square_to_parallelogram
+from zellij.path import Path, combine_paths
+from zellij.postulates import snap
 
 import pytest
 
@@ -125,3 +129,100 @@ def test_square_to_paralleogram(pt1, pt2):
         actual = Point(*(xform * pti))
         print(pti, pto, actual)
         assert actual.is_close(pto)
+
+
+def test_grid():
+    pt = PathCanvas(grid=0.5)
+    pt.move_to(100.1, 100.3)
+    pt.line_to(10.9, 20.24)
+    pt.rel_line_to(0.3, 0.3)
+    assert pt.paths == [
+        Path([Point(100.0, 100.5), Point(11.0, 20.0), Point(11.5, 20.5)]),
+    ]
+
+
+def test_grid_half_point():
+    # Two floats next to each other, either side of a half-grid point, snap
+    # to different grid points.  Defuzzing still joins the paths.
+    grid = 1e-9
+    lo, hi = 1000.4 * grid, 1000.6 * grid
+    while math.nextafter(lo, 1) != hi:
+        mid = (lo + hi) / 2
+        if snap(mid, grid) == snap(lo, grid):
+            lo = mid
+        else:
+            hi = mid
+    pt = PathCanvas(grid=grid)
+    pt.move_to(0, 0)
+    pt.line_to(lo, 0)
+    pt.move_to(hi, 0)
+    pt.line_to(1, 1)
+    assert pt.paths[0][-1] != pt.paths[1][0]
+    assert len(combine_paths(pt.paths, defuzz=False)) == 2
+    assert len(combine_paths(pt.paths)) == 1
+
+
+class PlainDrawing:
+    """Just enough of a Drawing for PathTiler."""
+    def __init__(self, width, height):
+        self.bounds = Bounds(0, 0, width, height)
+
+    def perimeter(self):
+        return Path(self.bounds.corners())
+
+
+def tiled_paths(design, size, grid=None):
+    tilew = size // 3
+    tiler = PathTiler(PlainDrawing(size, size), grid=grid and tilew * grid)
+    get_design(design)(tilew).draw(tiler)
+    return combine_paths(tiler.paths)
+
+def rounded_points(paths, size):
+    """All the points in `paths`, rounded to a fraction of `size`."""
+    return sorted((round(x / size, 7), round(y / size, 7)) for path in paths for x, y in path)
+
+
+@pytest.mark.parametrize("design", ["breath", "cards", "threestars"])
+@pytest.mark.parametrize("size", [800, 20000])
+def test_grid_looks_the_same(design, size):
+    # Snapping to a fine grid gives the same picture as floats.
+    float_paths = tiled_paths(design, size)
+    grid_paths = tiled_paths(design, size, grid=1e-10)
+    assert sorted(map(len, grid_paths)) == sorted(map(len, float_paths))
+    assert rounded_points(grid_paths, size) == rounded_points(float_paths, size)
+
+
+@pytest.mark.parametrize("vcol, vrow, period", [
+    ((10, 0), (0, 20), (10, 20)),
+    ((-10, 0), (0, -20), (10, 20)),
+    ((10, 0), (5, 15), (10, 30)),
+    ((10, 0), (10/3, 15), (10, 45)),
+    ((10, 0), (math.sqrt(2), 15), None),
+    ((10, 1), (0, 15), None),
+])
+def test_rectangular_period(vcol, vrow, period):
+    assert rectangular_period(vcol, vrow) == (pytest.approx(period) if period else None)
+
+
+@pytest.mark.parametrize("design", ["breath", "cards", "threestars"])
+def test_period_repeats(design):
+    # Every segment in the drawing is also there one period over.
+    size = 800
+    tiler = PathTiler(PlainDrawing(size, size))
+    get_design(design)(size // 3).draw(tiler)
+    pw, ph = tiler.period
+
+    def key(p1, p2):
+        return tuple(sorted((round(x, 3), round(y, 3)) for x, y in [p1, p2]))
+
+    segs = [seg for path in tiler.paths for seg in zip(path.points, path.points[1:])]
+    keys = {key(*seg) for seg in segs}
+    drawing = Bounds(0, 0, size, size)
+    checked = 0
+    for p1, p2 in segs:
+        for dx, dy in [(pw, 0), (0, ph), (-pw, 0), (0, -ph)]:
+            q1, q2 = Point(p1.x + dx, p1.y + dy), Point(p2.x + dx, p2.y + dy)
+            if all(p in drawing for p in [p1, p2, q1, q2]):
+                assert key(q1, q2) in keys
+                checked += 1
+    assert checked > 0
@@ -0,0 +1,147 @@
+"""Test zellij/png.py"""
+
+import io
+import struct
+import sys
+import zlib
+
+from hypothesis import given
+from hypothesis.strategies import binary
+import pytest
+
+from zellij.png import (
+    BandedPngWriter, adler32_combine, argb32_runs, argb32_to_rgb, argb32_to_rgba,
+    byte_differences, compress_band, filtered_rows, quantize_argb32, write_indexed_png,
+)
+
+
+@given(binary(), binary())
+def test_adler32_combine(b1, b2):
+    combined = adler32_combine(zlib.adler32(b1), zlib.adler32(b2), len(b2))
+    assert combined == zlib.adler32(b1 + b2)
+
+
+def test_argb32_to_rgb():
+    pixels = [(0x11, 0x22, 0x33), (0x44, 0x55, 0x66), (0x77, 0x88, 0x99)]
+    words = [0xff000000 | (r << 16) | (g << 8) | b for r, g, b in pixels]
+    # Two rows of three pixels, with a stride of 16 bytes.
+    row = b"".join(w.to_bytes(4, sys.byteorder) for w in words) + b"\0" * 4
+    assert argb32_to_rgb(row * 2, 3, 2, 16) == bytes.fromhex("112233445566778899") * 2
+
+
+def test_argb32_to_rgba():
+    # Premultiplied pixels: opaque, half-transparent, and fully transparent.
+    pixels = [(0xff, 0x11, 0x22, 0x33), (0x80, 0x40, 0x20, 0x00), (0, 0, 0, 0)]
+    words = [(a << 24) | (r << 16) | (g << 8) | b for a, r, g, b in pixels]
+    row = b"".join(w.to_bytes(4, sys.byteorder) for w in words) + b"\0" * 4
+    rgba = argb32_to_rgba(row * 2, 3, 2, 16)
+    assert rgba == bytes.fromhex("112233ff 80400080 00000000".replace(" ", "")) * 2
+
+
+def read_chunks(data):
+    """Produce the (kind, data) chunks in a PNG file, checking the CRCs."""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos = 8
+    while pos < len(data):
+        length, = struct.unpack(">I", data[pos:pos + 4])
+        kind = data[pos + 4:pos + 8]
+        chunk = data[pos + 8:pos + 8 + length]
+        crc, = struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])
+        assert crc == zlib.crc32(kind + chunk)
+        yield kind, chunk
+        pos += 12 + length
+
+
+@pytest.mark.parametrize("band_height", [1, 3, 10])
+def test_banded_png(band_height):
+    width, height = 7, 10
+    pixels = bytes(range(256)) * 3
+    pixels = pixels[:width * height * 3]
+    f = io.BytesIO()
+    writer = BandedPngWriter(f, width, height)
+    for top in range(0, height, band_height):
+        bottom = min(top + band_height, height)
+        band = pixels[top * width * 3:bottom * width * 3]
+        writer.write_band(compress_band(filtered_rows(band, width * 3), last=(bottom == height)))
+    writer.finish()
+
+    chunks = list(read_chunks(f.getvalue()))
+    assert chunks[0] == (b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    assert chunks[-1] == (b"IEND", b"")
+    idat = b"".join(chunk for kind, chunk in chunks if kind == b"IDAT")
+    # zlib.decompress checks the Adler-32 at the end.
+    assert zlib.decompress(idat) == filtered_rows(pixels, width * 3)
+
+
+@given(binary(min_size=1, max_size=50), binary(min_size=50, max_size=50))
+def test_byte_differences(a, b):
+    b = b[:len(a)]
+    assert byte_differences(a, b) == bytes((x - y) % 256 for x, y in zip(a, b))
+
+
+@pytest.mark.parametrize("filter_type, bpp, result", [
+    (0, 1, b"\0\1\2\3\0\4\5\7"),
+    (1, 1, b"\1\1\1\1\1\4\1\2"),
+    (1, 2, b"\1\1\2\2\1\4\5\3"),
+    (2, 1, b"\2\1\2\3\2\3\3\4"),
+])
+def test_filtered_rows(filter_type, bpp, result):
+    assert filtered_rows(bytes([1, 2, 3, 4, 5, 7]), 3, filter_type, bpp) == result
+
+
+def argb32(*colors):
+    """Pack (a, r, g, b) colors as ARGB32 words."""
+    return [(a << 24) | (r << 16) | (g << 8) | b for a, r, g, b in colors]
+
+
+def test_argb32_runs():
+    words = argb32((255, 1, 2, 3), (255, 1, 2, 3), (255, 4, 5, 6), (255, 1, 2, 3))
+    row = b"".join(w.to_bytes(4, sys.byteorder) for w in words) + b"\0" * 4
+    assert list(argb32_runs(row * 2, 4, 2, 20)) == [
+        (words[0], 2), (words[2], 1), (words[0], 3), (words[2], 1), (words[0], 1),
+    ]
+
+
+def test_quantize_argb32_exact():
+    words = argb32((255, 0, 0, 0), (255, 255, 255, 255), (128, 64, 64, 64))
+    palette, index = quantize_argb32({words[0]: 5, words[1]: 10, words[2]: 1}, colors=4)
+    assert palette == [(255, 255, 255, 255), (255, 0, 0, 0), (128, 64, 64, 64)]
+    assert index == {words[1]: 0, words[0]: 1, words[2]: 2}
+
+
+def test_quantize_argb32_blends():
+    # Two flat colors, with every blend between them, and a rare third color.
+    black, white, red = argb32((255, 0, 0, 0), (255, 255, 255, 255), (255, 255, 0, 0))
+    counts = {black: 1000, white: 900, red: 10}
+    blends = argb32(*((255, v, v, v) for v in range(1, 255)))
+    counts.update((w, 1) for w in blends)
+    palette, index = quantize_argb32(counts, colors=16)
+    assert len(palette) <= 16
+    assert palette[:2] == [(255, 0, 0, 0), (255, 255, 255, 255)]
+    assert palette[index[red]] == (255, 255, 0, 0)
+    for v, word in enumerate(blends, start=1):
+        # Three flat colors, with four blends between each pair: each gray
+        # is within half a step of its palette entry.
+        assert abs(palette[index[word]][1] - v) <= 51 / 2
+
+
+def test_write_indexed_png():
+    width, height = 3, 2
+    words = argb32(
+        (255, 255, 0, 0), (255, 255, 0, 0), (0, 0, 0, 0),
+        (128, 0, 0, 128), (255, 255, 0, 0), (0, 0, 0, 0),
+    )
+    f = io.BytesIO()
+    data = b"".join(w.to_bytes(4, sys.byteorder) for w in words)
+    write_indexed_png(f, data, width, height, width * 4)
+    chunks = dict(read_chunks(f.getvalue()))
+    assert chunks[b"IHDR"] == struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)
+    assert chunks[b"PLTE"] == bytes([255, 0, 0, 0, 0, 0, 0, 0, 255])
+    assert chunks[b"tRNS"] == bytes([255, 0, 128])
+    assert zlib.decompress(chunks[b"IDAT"]) == b"\0\0\0\1" + b"\0\2\0\1"
+
+    # The rows can be filtered.
+    f = io.BytesIO()
+    write_indexed_png(f, data, width, height, width * 4, strategy=zlib.Z_RLE, filter_type=2)
+    chunks = dict(read_chunks(f.getvalue()))
+    assert zlib.decompress(chunks[b"IDAT"]) == b"\2\0\0\1" + b"\2\2\0\0"
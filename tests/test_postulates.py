@@ -1,6 +1,11 @@
 import pytest
 
-from zellij.postulates import adjacent_pairs, all_pairs, fbetween, overlap, triples
+from hypothesis import given
+from hypothesis.strategies import integers, lists
+
+from zellij.postulates import (
+    adjacent_pairs, all_pairs, fbetween, least_rotation, overlap, snap, triples,
+)
 
 
 @pytest.mark.parametrize("seq, result", [
@@ -39,6 +44,24 @@ def test_fbetween(a, b, c, result):
     assert fbetween(a, b, c) == result
 
 
+@pytest.mark.parametrize("seq, result", [
+    ("a", 0),
+    ("ba", 1),
+    ("bbaaccaadd", 2),
+    ("aaaa", 0),
+    ("abab", 0),
+    ("cabcab", 1),
+])
+def test_least_rotation(seq, result):
+    assert least_rotation(seq) == result
+
+@given(lists(integers(min_value=0, max_value=3), min_size=1, max_size=30))
+def test_hypo_least_rotation(seq):
+    # Property: we find the same rotation as the brute-force way.
+    start = least_rotation(seq)
+    assert seq[start:] + seq[:start] == min(seq[i:] + seq[:i] for i in range(len(seq)))
+
+
 @pytest.mark.parametrize("s1, e1, s2, e2, result", [
     # Simple cases.
     (0, 5, 1, 6, True),
@@ -63,3 +86,14 @@ def test_overlap(s1, e1, s2, e2, result):
 ])
 def test_triples(seq, result):
     assert list("".join(them) for them in triples(list(seq))) == result
+
+
+@pytest.mark.parametrize("v, grid, result", [
+    (1.2, 0.5, 1.0),
+    (1.3, 0.5, 1.5),
+    (-1.3, 0.5, -1.5),
+    (123.456789, 1e-3, 123.45700000000001),
+    (0.1 + 0.2, 0.1, 0.30000000000000004),
+])
+def test_snap(v, grid, result):
+    assert snap(v, grid) == result
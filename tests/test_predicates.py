@@ -0,0 +1,61 @@
+"""Test predicates.py"""
+
+from fractions import Fraction
+
+from hypothesis import given
+from hypothesis.strategies import integers
+import pytest
+
+from zellij.euclid import Point, along_the_way
+from zellij.predicates import orient2d, incircle, sign
+
+from .hypo_helpers import fpoints, ipoints, t_zero_one
+
+
+@pytest.mark.parametrize("a, b, c, result", [
+    ((0, 0), (1, 0), (0, 1), 1),
+    ((0, 0), (0, 1), (1, 0), -1),
+    ((0, 0), (1, 1), (2, 2), 0),
+    ((0, 0), (1, 1), (1e6, 1e6 + 1), 1),
+    # Nearly collinear: these need the exact computation.
+    ((0.5, 0.5), (12, 12), (24, 24), 0),
+    ((0.5, 0.5000000000000001), (12, 12), (24, 24), 1),
+])
+def test_orient2d(a, b, c, result):
+    assert orient2d(a, b, c) == result
+
+
+def exact_orient2d(a, b, c):
+    (ax, ay), (bx, by), (cx, cy) = [(Fraction(x), Fraction(y)) for x, y in (a, b, c)]
+    return sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+@given(fpoints, fpoints, fpoints)
+def test_hypo_orient2d(a, b, c):
+    # Property: the answer is exactly right, and symmetric.
+    assert orient2d(a, b, c) == exact_orient2d(a, b, c)
+    assert orient2d(b, c, a) == orient2d(a, b, c)
+    assert orient2d(b, a, c) == -orient2d(a, b, c)
+
+@given(ipoints, ipoints, t_zero_one, integers(min_value=-30, max_value=30))
+def test_hypo_orient2d_scale(p1, p2, t, power):
+    # Property: scaling by a power of two doesn't change the answer.
+    p3 = along_the_way(p1, p2, t)
+    scale = 2.0 ** power
+    scaled = [Point(x * scale, y * scale) for x, y in [p1, p2, p3]]
+    assert orient2d(*scaled) == orient2d(p1, p2, p3)
+
+
+@pytest.mark.parametrize("d, result", [
+    ((0, 0), 1),
+    ((0.5, 0.5), 1),
+    ((1, 0), 0),
+    ((0, -1), 0),
+    ((1, 1), -1),
+    ((1.0000000000000002, 0), -1),
+])
+def test_incircle(d, result):
+    # The unit circle, counter-clockwise.
+    a, b, c = (1, 0), (0, 1), (-1, 0)
+    assert incircle(a, b, c, d) == result
+    # Clockwise order flips the answer.
+    assert incircle(c, b, a, d) == -result
@@ -0,0 +1,41 @@
+"""Test zellij/pyramid.py"""
+
+import os
+
+from zellij.euclid import Bounds
+from zellij.pyramid import TilePyramid
+
+
+def test_levels():
+    pyramid = TilePyramid(1000, 600, name="test")
+    assert pyramid.name == "test.dzi"
+    assert pyramid.tiles_dir == "test_files"
+    levels = list(pyramid.levels())
+    assert levels[0] == (10, 1, 1000, 600)
+    assert levels[1] == (9, .5, 500, 300)
+    assert levels[-2] == (1, 2 ** -9, 2, 2)
+    assert levels[-1] == (0, 2 ** -10, 1, 1)
+
+
+def test_tiles():
+    pyramid = TilePyramid(1000, 600, name="test", tile_size=256)
+    tiles = list(pyramid.tiles(500, 300))
+    assert tiles == [
+        (0, 0, Bounds(0, 0, 256, 256)),
+        (0, 1, Bounds(0, 256, 256, 300)),
+        (1, 0, Bounds(256, 0, 500, 256)),
+        (1, 1, Bounds(256, 256, 500, 300)),
+    ]
+
+
+def test_empty_tiles(tmp_path):
+    pyramid = TilePyramid(1000, 600, name=str(tmp_path / "test"), bg=(1, 0, 0))
+    empty_tiles = {}
+    names = [str(tmp_path / f"{n}.png") for n in range(3)]
+    pyramid._empty_tile(names[0], Bounds(0, 0, 256, 256), empty_tiles)
+    pyramid._empty_tile(names[1], Bounds(256, 0, 512, 256), empty_tiles)
+    pyramid._empty_tile(names[2], Bounds(0, 0, 100, 256), empty_tiles)
+    # Tiles of the same size share one file.
+    assert os.path.samefile(names[0], names[1])
+    assert not os.path.samefile(names[0], names[2])
+    assert open(names[0], "rb").read(8) == b"\x89PNG\r\n\x1a\n"
@@ -0,0 +1,88 @@
+"""Test zellij/record.py"""
+
+import math
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from zellij.drawing import Drawing
+from zellij.euclid import Bounds, Point
+from zellij.path import Path
+from zellij.record import scale_ops, split_subpaths
+
+
+def record(draw_func, width=100, height=100):
+    dwg = Drawing(width, height, name="rec", backend='record', bg=None)
+    draw_func(dwg)
+    return dwg.surface
+
+
+def draw_two_lines(dwg):
+    dwg.draw_paths([
+        Path([Point(10, 10), Point(20, 10)]),
+        Path([Point(60, 60), Point(80, 60), Point(80, 90)]),
+    ], width=2, rgb=(1, 0, 0))
+    dwg.fill_points([Point(50, 20)], radius=5)
+
+
+def test_split_subpaths():
+    ops = [("M", 0, 0), ("L", 10, 0), ("M", 5, 5), ("L", 5, 8), ("Z",)]
+    assert split_subpaths(ops, 1) == [
+        (Bounds(-1, -1, 11, 1), [("M", 0, 0), ("L", 10, 0)]),
+        (Bounds(4, 4, 6, 9), [("M", 5, 5), ("L", 5, 8), ("Z",)]),
+    ]
+
+
+def test_scale_ops():
+    ops = [("M", 0, 0), ("L", 10, 0.1), ("L", 20, 0), ("Z",), ("L", 0, 10), ("A", 0, 0, 10, 0, 1, False)]
+    assert scale_ops(ops, 0.5, tolerance=0) == [
+        ("M", 0, 0), ("L", 5, 0.05), ("L", 10, 0), ("Z",), ("L", 0, 5), ("A", 0, 0, 5, 0, 1, False),
+    ]
+    # The wobble is smaller than the tolerance.
+    assert scale_ops(ops, 0.5, tolerance=0.1)[:3] == [("M", 0, 0), ("L", 10, 0), ("Z",)]
+
+
+def test_recording():
+    rec = record(draw_two_lines)
+    stroke, fill = rec.shapes
+    assert stroke.kind == "stroke"
+    assert stroke.style.rgba == (1, 0, 0, 1)
+    assert len(stroke.subpaths) == 2
+    assert fill.kind == "fill"
+    # Miter joins can stick out five line widths.
+    assert stroke.subpaths[0][0] == Bounds(0, 0, 30, 20)
+    assert rec.touched_tiles(50) == {(0, 0), (1, 0), (1, 1)}
+    assert rec.scaled(.5).touched_tiles(50) == {(0, 0)}
+
+    culled = rec.culled(Bounds(50, 50, 100, 100))
+    assert len(culled.shapes) == 1
+    assert culled.shapes[0].subpaths == stroke.subpaths[1:]
+
+    # Tiling gives each touched tile its culled recording.  A tile includes
+    # its top and left edges, but not its bottom and right.
+    tiles = rec.tiled(50)
+    assert set(tiles) == rec.touched_tiles(50)
+    for (col, row), tile in tiles.items():
+        bounds = Bounds(col * 50, row * 50, col * 50 + 49.99, row * 50 + 49.99)
+        assert tile.shapes == rec.culled(bounds).shapes
+
+
+def test_replay(tmp_path):
+    # Replaying a recording gives the same SVG as drawing directly.
+    def svg_paths(name):
+        return [
+            (p.get("d"), p.get("stroke"), p.get("fill"))
+            for p in ET.parse(name).getroot().findall("{http://www.w3.org/2000/svg}path")
+        ]
+
+    direct = str(tmp_path / "direct.svg")
+    dwg = Drawing(100, 100, name=direct, bg=None)
+    draw_two_lines(dwg)
+    dwg.finish()
+
+    replayed = str(tmp_path / "replayed.svg")
+    dwg = Drawing(100, 100, name=replayed, bg=None)
+    dwg.replay(record(draw_two_lines))
+    dwg.finish()
+
+    assert svg_paths(replayed) == svg_paths(direct)
@@ -0,0 +1,129 @@
+"""Test zellij/svg.py"""
+
+import gzip
+import io
+import math
+import xml.etree.ElementTree as ET
+
+from affine import Affine
+import pytest
+
+from zellij.design import get_design
+from zellij.euclid import Point
+from zellij.path import Path
+from zellij.path_tiler import PathTiler
+from zellij.svg import InstancedSvg, SvgContext, SvgSurface, svg_color, svg_matrix, svg_number, svg_path_data
+
+
+@pytest.mark.parametrize("v, precision, s", [
+    (1, 3, "1"),
+    (1.5, 3, "1.5"),
+    (1.23456, 3, "1.235"),
+    (100.0, 3, "100"),
+    (-0.0001, 3, "0"),
+    (1.23456, 0, "1"),
+])
+def test_svg_number(v, precision, s):
+    assert svg_number(v, precision) == s
+
+
+def test_svg_color():
+    assert svg_color((1, 0, .5)) == "#ff0080"
+
+
+@pytest.mark.parametrize("xform, s", [
+    (Affine.translation(10, 20.5), "translate(10 20.5)"),
+    (Affine.scale(2, 3), "matrix(2 0 0 3 0 0)"),
+    (Affine(1, 2, 3, 4, 5, 6), "matrix(1 4 2 5 3 6)"),
+])
+def test_svg_matrix(xform, s):
+    assert svg_matrix(xform) == s
+
+
+def test_svg_path_data():
+    paths = [
+        Path([Point(0, 0), Point(10, 0), Point(10, 10.5)]),
+        Path([Point(1, 1), Point(2, 1), Point(1, 2), Point(1, 1)]),
+    ]
+    assert svg_path_data(paths) == "M0 0L10 0L10 10.5M1 1L2 1L1 2Z"
+
+
+def rounded_points(paths):
+    return sorted((round(x, 6), round(y, 6)) for path in paths for x, y in path)
+
+
+@pytest.mark.parametrize("design", ["breath", "cards", "threestars"])
+def test_instanced_svg(design):
+    svg = InstancedSvg(800, 600, "test.svg")
+    tiler = PathTiler(svg)
+    get_design(design)(200).draw(tiler)
+
+    # The unit paths, placed by the orbit and the cells, are the whole tiling.
+    placed = [
+        path.transform(cell * element)
+        for cell in tiler.cells
+        for element in tiler.orbit
+        for path in tiler.unit_paths
+    ]
+    assert rounded_points(placed) == rounded_points(tiler.paths)
+
+    # Only the instances are needed to write the SVG.
+    tiler = PathTiler(svg, instances_only=True)
+    get_design(design)(200).draw(tiler)
+    assert rounded_points(placed) != rounded_points(tiler.paths)
+    f = io.StringIO()
+    svg.write(f, tiler, [(2, (0, 0, 0))])
+    root = ET.fromstring(f.getvalue())
+    uses = root.findall(".//{http://www.w3.org/2000/svg}use")
+    assert len(uses) == len(tiler.orbit) + len(tiler.cells) + 1
+
+
+def test_svg_context_stroke():
+    f = io.StringIO()
+    ctx = SvgContext(SvgSurface(f, 200, 200))
+    ctx.translate(100, 100)
+    ctx.scale(2, 2)
+    ctx.move_to(0, 0)
+    ctx.line_to(10, 0.0001)
+    ctx.save()
+    ctx.set_source_rgb(1, 0, 0)
+    ctx.set_line_width(3)
+    ctx.set_dash([5, 5])
+    ctx.stroke()
+    ctx.restore()
+    assert ctx.get_line_width() == 2
+    assert ctx.get_dash() == ((), 0)
+    ctx.arc(0, 0, 10, 0, 2 * math.pi)
+    ctx.fill()
+    assert f.getvalue().splitlines()[2:] == [
+        '<path d="M100 100L120 100" fill="none" stroke="#ff0000" stroke-width="6" stroke-dasharray="10 10"/>',
+        '<path d="M120 100A20 20 0 0 1 80 100A20 20 0 0 1 120 100" fill="#000000"/>',
+    ]
+
+
+def test_svg_context_matrix():
+    ctx = SvgContext(SvgSurface(io.StringIO(), 100, 100))
+    ctx.translate(10, 20)
+    ctx.rotate(math.pi / 2)
+    assert ctx.user_to_device(1, 0) == pytest.approx((10, 21))
+    assert ctx.device_to_user(10, 21) == pytest.approx((1, 0))
+    m = ctx.get_matrix()
+    assert (m.xx, m.yx, m.xy, m.yy, m.x0, m.y0) == pytest.approx((0, 1, -1, 0, 10, 20))
+    ctx.identity_matrix()
+    ctx.set_matrix(m)
+    assert ctx.user_to_device(1, 0) == pytest.approx((10, 21))
+
+
+@pytest.mark.parametrize("name", ["test.svg", "test.svgz"])
+def test_svg_surface(tmp_path, name):
+    surface = SvgSurface(str(tmp_path / name), 100, 50)
+    ctx = SvgContext(surface)
+    ctx.rectangle(10, 10, 20, 20)
+    ctx.fill()
+    surface.finish()
+    data = (tmp_path / name).read_bytes()
+    if name.endswith(".svgz"):
+        data = gzip.decompress(data)
+    root = ET.fromstring(data)
+    assert root.get("viewBox") == "0 0 100 50"
+    assert root.find("{http://www.w3.org/2000/svg}path").get("d") == "M10 10L30 10L30 30L10 30Z"
@@ -0,0 +1,80 @@
+"""
+Rendering huge PNG drawings in horizontal bands, in parallel.
+"""
+
+import concurrent.futures
+import os
+import random
+
+from .euclid import Bounds
+from .drawing import Drawing, StandInDrawing, cairo
+from .png import BandedPngWriter, argb32_to_rgb, compress_band, filtered_rows
+from .svg import Matrix
+
+
+class BandedDrawing(StandInDrawing):
+    """A PNG drawing that is rendered in horizontal bands.
+
+    This stands in for a Drawing while the geometry is computed.  Then
+    `render` draws each band in a worker process, and writes the PNG as the
+    bands finish, so only a few bands are ever in memory.
+
+    `band_height` is the number of rows in each band, and `processes` is the
+    number of workers, defaulting to the number of CPUs.
+
+    """
+    def __init__(
+        self, width, height, name=None, bg=(1, 1, 1), format=None, snap=True,
+        band_height=1024, processes=None,
+    ):
+        super().__init__(width, height, name=name, format=format, snap=snap)
+        if self.format != 'png':
+            raise ValueError(f"Can't draw {self.format} in bands")
+        if not bg or len(bg) != 3:
+            raise ValueError("Drawing in bands needs an opaque background")
+        self.bg = bg
+        self.band_height = band_height
+        self.processes = processes
+
+    def bands(self):
+        """The (top, bottom) rows of each band."""
+        for top in range(0, self.height, self.band_height):
+            yield top, min(top + self.band_height, self.height)
+
+    def render(self, draw_func, *args):
+        """Draw the bands with `draw_func(dwg, *args)`, and write the PNG.
+
+        `draw_func` and `args` are sent to the worker processes, so they must
+        be picklable.  Each worker seeds `random` the same way, so random
+        styles agree across bands.
+
+        """
+        seed = random.random()
+        jobs = [
+            (self, top, bottom, bottom == self.height, seed, draw_func, args)
+            for top, bottom in self.bands()
+        ]
+        processes = self.processes or os.cpu_count()
+        with open(self.name, "wb") as f:
+            writer = BandedPngWriter(f, self.width, self.height)
+            with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+                for band in executor.map(_render_band, jobs):
+                    writer.write_band(band)
+            writer.finish()
+
+
+def _render_band(job):
+    """Render one band in a worker, returning its compressed rows."""
+    banded, top, bottom, last, seed, draw_func, args = job
+    random.seed(seed)
+    dwg = Drawing(
+        bounds=Bounds(0, top, banded.width, bottom),
+        bg=banded.bg, snap=banded.snap,
+    )
+    dwg.transform(cairo.Matrix(*Matrix.from_affine(banded.transform)))
+    draw_func(dwg, *args)
+    dwg.surface.flush()
+    rgb = argb32_to_rgb(
+        dwg.surface.get_data(), dwg.width, dwg.height, dwg.surface.get_stride()
+    )
+    return compress_band(filtered_rows(rgb, dwg.width * 3), last)
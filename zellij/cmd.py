@@ -1,17 +1,41 @@
 """Command-line interface for Zellij."""
 
+import collections
+import concurrent.futures
+import json
 import math
 import pprint
 
+try:
+    import tomllib
+except ImportError:
+    # Job files can be JSON Lines without it.
+    tomllib = None
+
+from affine import Affine
 import click
 
+from zellij.bands import BandedDrawing
 from zellij.color import random_color, parse_color
-from zellij.debug import debug_world, debug_click_options, should_debug
+from zellij.debug import debug_world, debug_click_options, set_debugs, should_debug
 from zellij.design import get_design
-from zellij.drawing import Drawing
-from zellij.path import combine_paths, draw_paths, clip_paths, perturb_paths
+from zellij.drawing import Drawing, StandInDrawing, name_and_format
+from zellij.path import (
+    combine_paths, dedupe_paths, defuzz_paths, draw_paths, clip_paths, merge_overlaps,
+    perturb_paths, simplify_paths,
+)
 from zellij.path_tiler import PathTiler
+from zellij.png import PNG_FILTERS, ZLIB_STRATEGIES
+from zellij.pyramid import TilePyramid
 from zellij.strap import strapify
+from zellij.svg import InstancedSvg
+
+
+# --draft draws at this fraction of the size, with paths smaller than
+# DRAFT_LOD pixels drawn as dots.  It was timed only for SVG output: how much
+# faster it makes raster (PNG) rendering hasn't been measured.
+DRAFT_SCALE = 0.5
+DRAFT_LOD = 1.5
 
 
 def size_type(s):
@@ -34,8 +58,17 @@ _common_options = {
         click.option('--size', type=size_type, default='800', help='Size of the output'),
         click.option('--rotate', type=float, default=0, help='Angle to rotate the drawing'),
         click.option('--background', type=parse_color, help='The color of the background'),
-        click.option('--format', help='The output format, png or svg'),
+        click.option('--format', help='The output format: png, svg, svgz, rgba or raw for unencoded pixels, or dzi for a Deep Zoom tile pyramid'),
+        click.option('--precision', type=int, default=3, help='Decimal places for SVG coordinates'),
+        click.option('--palette', type=click.IntRange(0, 256), default=0, help='Write PNG with an indexed palette of at most this many colors'),
+        click.option('--png-level', type=click.IntRange(0, 9), default=9, help='zlib compression level for --palette PNG'),
+        click.option('--png-strategy', type=click.Choice(list(ZLIB_STRATEGIES)), default='default', help='zlib strategy for --palette PNG: rle is much faster'),
+        click.option('--png-filter', type=click.Choice(list(PNG_FILTERS)), default='none', help='Row filter for --palette PNG'),
+        click.option('--band-height', type=int, default=0, help='Render PNG in parallel bands of this many rows'),
         click.option('--perturb', type=float, default=0, help='A random amount to jostle points'),
+        click.option('--simplify', type=float, default=0, help='Simplify paths to within this many pixels before drawing'),
+        click.option('--grid', type=float, default=0, help='Snap points to this fraction of a tile width, e.g. 1e-10'),
+        click.option('--draft', is_flag=True, help='Draw a quick preview: half size, fast antialiasing, tiny paths as dots (the PNG speedup is unmeasured)'),
         click.argument('design'),
     ],
 }
@@ -61,14 +94,64 @@ def start_drawing(opt, **drawing_args):
 
     name = opt['output']
     def_name = drawing_args.pop('name', 'drawing')
-    format = opt['format']
+    name, format = name_and_format(name or def_name, opt['format'])
+
+    scale = 1
+    if opt['draft']:
+        if format == 'dzi' or opt['band_height']:
+            raise click.UsageError("--draft makes a single small drawing, not a pyramid or bands")
+        scale = DRAFT_SCALE
+        drawing_args.update(antialias='fast', lod=DRAFT_LOD)
+    if opt['palette'] and (format == 'dzi' or opt['band_height']):
+        raise click.UsageError("--palette is only for a single PNG drawing")
+
+    if format == 'dzi':
+        dwg = TilePyramid(width, height, name=name, bg=bg, **drawing_args)
+    elif opt['band_height']:
+        dwg = BandedDrawing(
+            width, height, name=name, format=format, bg=bg,
+            band_height=opt['band_height'], **drawing_args
+        )
+    else:
+        dwg = Drawing(
+            round(width * scale), round(height * scale), name=name, format=format, bg=bg,
+            precision=opt['precision'], palette=opt['palette'], png_level=opt['png_level'],
+            png_strategy=ZLIB_STRATEGIES[opt['png_strategy']], png_filter=PNG_FILTERS[opt['png_filter']],
+            **drawing_args
+        )
+        # User space stays the full size.
+        dwg.scale(scale, scale)
+    place_drawing(dwg, opt)
+    return dwg
 
-    dwg = Drawing(width, height, name=name or def_name, format=format, bg=bg, **drawing_args)
+def place_drawing(dwg, opt):
+    """Rotate the drawing about its center, as the options say."""
+    width, height = opt['size']
     dwg.translate(width/2, height/2)
     dwg.rotate(opt['rotate'])
+    if opt['rotate'] % 90:
+        # Snapping to pixels only helps lines parallel to the axes.
+        dwg.snap = False
     dwg.translate(-width/2, -height/2)
+
+def geometry_drawing(opt):
+    """A StandInDrawing placed like start_drawing's, to compute geometry on."""
+    width, height = opt['size']
+    scale = DRAFT_SCALE if opt['draft'] else 1
+    dwg = StandInDrawing(round(width * scale), round(height * scale))
+    dwg.scale(scale, scale)
+    place_drawing(dwg, opt)
     return dwg
 
+def drawing_transform(opt):
+    """The user-to-device Affine that start_drawing sets up."""
+    width, height = opt['size']
+    return (
+        Affine.translation(width/2, height/2) *
+        Affine.rotation(opt['rotate']) *
+        Affine.translation(-width/2, -height/2)
+    )
+
 @click.group()
 def clickmain():
     """Make Islamic-inspired geometric art."""
@@ -79,25 +162,39 @@ def clickmain():
 @common_options('common')
 @common_options('drawing')
 @click.option("--strap-width", type=float, default=6, help='Width of the straps, in tile-percent')
+@click.option("--trim/--no-trim", default=True, help='Trim the ends of straps where they go under')
 def straps(**opt):
     """Draw with over-under straps"""
-    dwg = start_drawing(opt, name="straps", bg=(.8, .8, .8))
+    dwg = start_drawing(opt, **STRAPS_DRAWING)
+    dwg.render(draw_straps, *straps_geometry(opt, dwg))
 
-    tilew = int(dwg.width/opt['tiles'])
+STRAPS_DRAWING = dict(name="straps", bg=(.8, .8, .8))
+
+def straps_geometry(opt, dwg):
+    """Compute the straps for the straps command, returning (straps,)."""
+    width, height = opt['size']
+    tilew = int(width/opt['tiles'])
     if opt['strap_width'] > 0:
         strap_kwargs = dict(width=tilew * opt['strap_width'] / 100, random_factor=0)
     else:
         strap_kwargs = dict(width=tilew / 60, random_factor=4.9)
 
-    tiler = PathTiler(dwg)
+    grid = tilew * opt['grid']
+    tiler = PathTiler(dwg, grid=grid)
     design_class = get_design(opt['design'])
     draw = design_class(tilew)
     draw.draw(tiler)
-    paths_all = combine_paths(tiler.paths)
-    paths = clip_paths(paths_all, dwg.perimeter().bounds())
+    paths_all = defuzz_paths(tiler.paths)
+    paths_all = combine_paths(merge_overlaps(dedupe_paths(paths_all)), defuzz=False)
+    # Cut the paths at the edge of the drawing, far enough out that the
+    # widest strap's cut end can't be seen.
+    margin = strap_kwargs['width'] * (1 + strap_kwargs['random_factor'])
+    paths = clip_paths(paths_all, dwg.perimeter(), margin=margin)
 
     if opt['perturb']:
         paths = perturb_paths(paths, opt['perturb'])
+        # Perturbed points are no longer on the grid.
+        grid = 0
 
     if should_debug('world'):
         debug_world(dwg, paths_styles=[
@@ -105,10 +202,21 @@ def straps(**opt):
             (paths, dict(width=1.5, rgb=(1, 0, 0))),
         ])
 
-    straps = strapify(paths, **strap_kwargs)
+    straps = strapify(paths, grid=grid, trim=opt['trim'], **strap_kwargs)
+
+    if opt['simplify']:
+        tolerance = dwg.device_to_user_length(opt['simplify'])
+        for strap in straps:
+            strap.sides = simplify_paths(strap.sides, tolerance)
+
+    return (straps,)
 
+def draw_straps(dwg, straps):
     with dwg.style(rgb=(1, 1, 1)):
         for strap in straps:
+            # Each strap is filled on its own: straps overlap where they
+            # cross, and one fill of them all would leave holes wherever
+            # they wind opposite ways.
             strap.sides[0].draw(dwg)
             strap.sides[1].draw(dwg, append=True, reverse=True)
             dwg.close_path()
@@ -118,35 +226,86 @@ def straps(**opt):
         for strap in straps:
             for side in strap.sides:
                 side.draw(dwg)
-                dwg.stroke()
-
-    dwg.finish()
+        dwg.stroke()
 
 @clickmain.command()
 @common_options('common')
 @common_options('drawing')
 def candystripe(**opt):
     """Draw with crazy colors and a white stripe"""
-    dwg = start_drawing(opt, name="candy")
-    tilew = int(dwg.width/opt['tiles'])
+    dwg = start_drawing(opt, **CANDYSTRIPE_DRAWING)
+    dwg.render(draw_candystripe, *candystripe_geometry(opt, dwg))
 
-    tiler = PathTiler(dwg)
+CANDYSTRIPE_DRAWING = dict(name="candy")
+
+def candystripe_geometry(opt, dwg):
+    """Compute the paths for the candystripe command, returning (paths, line_width)."""
+    width, height = opt['size']
+    tilew = int(width/opt['tiles'])
+
+    grid = tilew * opt['grid']
+    tiler = PathTiler(dwg, grid=grid)
     design_class = get_design(opt['design'])
     draw = design_class(tilew)
     draw.draw(tiler)
-    paths = combine_paths(tiler.paths)
+    paths = defuzz_paths(tiler.paths)
+    paths = combine_paths(merge_overlaps(dedupe_paths(paths)), defuzz=False)
+
+    if opt['simplify']:
+        paths = simplify_paths(paths, dwg.device_to_user_length(opt['simplify']))
 
     LINE_WIDTH = tilew/4
 
+    return (paths, LINE_WIDTH)
+
+def draw_candystripe(dwg, paths, line_width):
     dwg.multi_stroke(paths, [
-        #(LINE_WIDTH, (0, 0, 0)),
-        (LINE_WIDTH-2, random_color),
+        #(line_width, (0, 0, 0)),
+        (line_width-2, random_color),
         #(7, (0, 0, 0)),
         (5, (1, 1, 1)),
     ])
-    dwg.finish()
 
 
+@clickmain.command()
+@common_options('common')
+@common_options('drawing')
+@click.option("--line-width", type=float, default=2, help='Width of the lines')
+def lines(**opt):
+    """Draw just the lines of a design"""
+    width, height = opt['size']
+    tilew = int(width/opt['tiles'])
+    styles = [(opt['line_width'], (0, 0, 0))]
+
+    name, format = name_and_format(opt['output'] or "lines", opt['format'])
+    if format in ['svg', 'svgz']:
+        if opt['draft']:
+            raise click.UsageError("--draft can't be used with lines as SVG")
+        # Each shape is written once, and reused.
+        bg = opt['background']
+        if bg is None:
+            bg = (1, 1, 1)
+        dwg = InstancedSvg(
+            width, height, name, transform=drawing_transform(opt), bg=bg,
+            precision=opt['precision'],
+        )
+    else:
+        dwg = start_drawing(opt, name="lines")
+
+    instanced = isinstance(dwg, InstancedSvg)
+    tiler = PathTiler(dwg, instances_only=instanced)
+    design_class = get_design(opt['design'])
+    draw = design_class(tilew)
+    draw.draw(tiler)
+
+    if instanced:
+        dwg.finish(tiler, styles)
+    else:
+        dwg.render(draw_lines, tiler.paths, styles, tiler.period)
+
+def draw_lines(dwg, paths, styles, period):
+    dwg.multi_stroke(paths, styles, period=period)
+
 @clickmain.command()
 @common_options('common')
 @common_options('drawing')
@@ -162,15 +321,13 @@ def diagram(**opt):
     # The full pattern.
     tiler = PathTiler(dwg)
     draw.draw(tiler)
-    with dwg.style(rgb=(.5, .5, .5)):
-        draw_paths(tiler.paths, dwg)
-        dwg.stroke()
+    dwg.multi_stroke(tiler.paths, [(2, (.5, .5, .5))], period=tiler.period)
 
     # The symmetry.
     tiler = PathTiler(dwg)
     tiler.tile_p6m(draw.draw_tiler_unit, tilew)
     with dwg.style(rgb=(1, .75, .75), width=1, dash=[5, 5]):
-        draw_paths(tiler.paths, dwg)
+        draw_paths(merge_overlaps(defuzz_paths(tiler.paths)), dwg)
         dwg.stroke()
 
     def single_tiler():
@@ -197,6 +354,120 @@ def diagram(**opt):
 
     dwg.finish()
 
+# The commands that `batch` can run: the arguments for start_drawing, the
+# function to compute the geometry, the function to draw it, and the
+# options that the geometry depends on.
+BATCH_COMMANDS = {
+    'straps': (
+        STRAPS_DRAWING, straps_geometry, draw_straps,
+        ['design', 'tiles', 'size', 'rotate', 'draft', 'grid', 'perturb', 'simplify', 'strap_width', 'trim'],
+    ),
+    'candystripe': (
+        CANDYSTRIPE_DRAWING, candystripe_geometry, draw_candystripe,
+        ['design', 'tiles', 'size', 'rotate', 'draft', 'grid', 'simplify'],
+    ),
+}
+
+def read_jobs(filename):
+    """Read the jobs from a batch file, a list of dicts.
+
+    A .toml file has a [[job]] table for each job.  Any other file is JSON
+    Lines, with one job object on each line.
+
+    """
+    if filename.endswith(".toml"):
+        if tomllib is None:
+            raise click.UsageError("TOML job files need Python 3.11 or later")
+        with open(filename, "rb") as f:
+            return tomllib.load(f).get("job", [])
+    with open(filename) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def job_options(job, num):
+    """Parse one batch job into (command name, opt dict).
+
+    The job has a "command", and the command's options with underscores for
+    dashes.  They are parsed just as on the command line, so the defaults
+    are the same.  Without an "output", job `num` is named for its command.
+
+    """
+    job = dict(job)
+    name = job.pop('command', None)
+    if name not in BATCH_COMMANDS:
+        raise click.UsageError(f"Batch job {num}: command should be one of {', '.join(BATCH_COMMANDS)}")
+    job.setdefault('output', f"{name}_{num:04d}")
+    command = clickmain.get_command(None, name)
+    options, arguments = [], []
+    for param in command.params:
+        if param.name not in job:
+            continue
+        value = job.pop(param.name)
+        if isinstance(param, click.Argument):
+            arguments.append(str(value))
+        elif param.is_flag:
+            if value:
+                options.append(param.opts[0])
+            elif param.secondary_opts:
+                options.append(param.secondary_opts[0])
+        else:
+            options.extend([param.opts[0], str(value)])
+    if job:
+        raise click.UsageError(f"Batch job {num}: unknown options for {name}: {', '.join(job)}")
+    ctx = command.make_context(name, options + arguments)
+    return name, ctx.params
+
+def _batch_geometry(job):
+    """Compute the geometry for a batch job, in a worker process."""
+    name, opt = job
+    set_debugs(opt['debug'])
+    _, geometry, _, _ = BATCH_COMMANDS[name]
+    return geometry(opt, geometry_drawing(opt))
+
+def _batch_render(job):
+    """Draw one batch job with its geometry, in a worker process."""
+    name, opt, args = job
+    set_debugs(opt['debug'])
+    drawing_args, _, draw_func, _ = BATCH_COMMANDS[name]
+    dwg = start_drawing(opt, **drawing_args)
+    dwg.render(draw_func, *args)
+    return dwg.name
+
+@clickmain.command()
+@common_options('common')
+@click.option('--processes', type=int, default=0, help='How many processes to use, default one per CPU')
+@click.argument('jobs', type=click.Path(exists=True, dir_okay=False))
+def batch(**opt):
+    """Draw a file of jobs, computing each distinct geometry once.
+
+    JOBS is a JSON Lines or TOML file.  Each job is a "command" (straps or
+    candystripe) and its options.  Jobs that differ only in how they are
+    drawn (colors, output, format) share their geometry.  A job without
+    its own --debug uses the batch's.
+    """
+    jobs = [job_options(job, num) for num, job in enumerate(read_jobs(opt['jobs']))]
+    groups = collections.defaultdict(list)
+    for name, job_opt in jobs:
+        if not job_opt['debug']:
+            job_opt['debug'] = opt['debug']
+        key = (name, tuple(job_opt[o] for o in BATCH_COMMANDS[name][3]))
+        groups[key].append((name, job_opt))
+    print(f"{len(jobs)} jobs, {len(groups)} geometries")
+
+    with concurrent.futures.ProcessPoolExecutor(opt['processes'] or None) as executor:
+        # Each geometry's group of renders is queued as soon as it's done.
+        # The future for a render maps to None.
+        pending = {executor.submit(_batch_geometry, group[0]): group for group in groups.values()}
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                group = pending.pop(future)
+                if group is None:
+                    print(f"Wrote {future.result()}")
+                    continue
+                args = future.result()
+                for name, job_opt in group:
+                    pending[executor.submit(_batch_render, (name, job_opt, args))] = None
+
 @clickmain.command()
 @common_options('common')
 @common_options('drawing')
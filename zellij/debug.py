@@ -28,6 +28,11 @@ debug_click_options = [
     click.option('--debug', type=debug_type, default=""),
 ]
 
+def set_debugs(debugs):
+    """Use `debugs` as the --debug switches, for work in another process."""
+    global DEBUGS
+    DEBUGS = list(debugs)
+
 def should_debug(opt):
     """Is `opt` one of the --debug switches provided?"""
     return opt in DEBUGS
@@ -39,6 +44,19 @@ def tick_range(lo, hi, step):
     hi = ((hi // step) + 1) * step
     return range(lo, hi, step)
 
+def draw_grid(dwg):
+    """Draw a reference grid over a whole drawing, one stroke per style."""
+    llx, lly, urx, ury = dwg.bounds
+    for step, dash in [(20, [5, 5]), (100, None)]:
+        with dwg.style(rgb=(.5, 1, 1), width=1, dash=dash, dash_offset=7.5):
+            for x in tick_range(llx, urx, step):
+                dwg.move_to(x, lly)
+                dwg.line_to(x, ury)
+            for y in tick_range(lly, ury, step):
+                dwg.move_to(llx, y)
+                dwg.line_to(urx, y)
+            dwg.stroke()
+
 def debug_world(dwg0, paths_styles):
     """Draw a picture of the entire world.
 
@@ -57,34 +75,15 @@ def debug_world(dwg0, paths_styles):
     bounds |= dwg0_path.bounds()
     bounds = bounds.expand(percent=2)
 
-    dwg = Drawing(bounds=bounds, name="debug_world", bg=(.95, .95, .95))
+    # The world can be huge: draw tiny paths as dots.
+    dwg = Drawing(bounds=bounds, name="debug_world", bg=(.95, .95, .95), lod=0.5)
 
     # White rectangle: the desired visible canvas.
     with dwg.style(rgb=(1, 1, 1)):
         dwg0_path.draw(dwg)
         dwg.fill()
 
-    # Reference grid.
-    llx, lly, urx, ury = dwg.bounds
-    with dwg.style(rgb=(.5, 1, 1), width=1, dash=[5, 5], dash_offset=7.5):
-        for xmin in tick_range(llx, urx, 20):
-            dwg.move_to(xmin, lly)
-            dwg.line_to(xmin, ury)
-            dwg.stroke()
-        for ymin in tick_range(lly, ury, 20):
-            dwg.move_to(llx, ymin)
-            dwg.line_to(urx, ymin)
-            dwg.stroke()
-
-    with dwg.style(rgb=(.5, 1, 1), width=1):
-        for xmaj in tick_range(llx, urx, 100):
-            dwg.move_to(xmaj, lly)
-            dwg.line_to(xmaj, ury)
-            dwg.stroke()
-        for ymaj in tick_range(lly, ury, 100):
-            dwg.move_to(llx, ymaj)
-            dwg.line_to(urx, ymaj)
-            dwg.stroke()
+    draw_grid(dwg)
 
     # The origin.
     with dwg.style(rgb=(0, .75, .75), width=1):
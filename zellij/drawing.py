@@ -2,27 +2,47 @@
 A convenience wrapper around Cairo.
 """
 
+import collections
+import concurrent.futures
 import contextlib
 import itertools
 import math
 import os.path
 import sys
+import threading
+import zlib
 
-import cairo
+from affine import Affine
+
+try:
+    import cairo
+except ImportError:
+    # SVG can be written without Cairo.
+    cairo = None
 
 from .euclid import Bounds, Point
-from .path import Path, paths_bounds
+from .path import Dot, Path, paths_bounds
+from .png import argb32_to_rgba, write_indexed_png
+from .record import MITER_REACH, RecordingSurface
+from .svg import SvgContext, SvgSurface
+
+
+# Formats drawn on a Cairo ImageSurface.
+RASTER_FORMATS = ['png', 'rgba', 'raw']
 
 
 def name_and_format(name, format):
     """Resolve the filename and format of a drawing.
 
-    `format` is 'png', 'svg', or None. If None, then the file extension of
-    `name` is used, or 'png' if there is no extension.
+    `format` is 'png', 'svg', 'svgz', 'rgba', 'raw', or None. If None, then the
+    file extension of `name` is used, or 'png' if there is no extension.
 
-    If `name` is extensionless, then the format is used as the extension.
+    If `name` is extensionless, then the format is used as the extension.  If
+    `name` is None, the drawing isn't written to a file, and stays None.
 
     """
+    if name is None:
+        return None, format or "png"
     name_base, name_ext = os.path.splitext(name)
     if format is None:
         if name_ext:
@@ -35,14 +55,105 @@ def name_and_format(name, format):
     return name, format
 
 
+def image_stride(width):
+    """The number of bytes in each row of a `width`-pixel ARGB32 image."""
+    return cairo.ImageSurface.format_stride_for_width(cairo.Format.ARGB32, width)
+
+
+def coord_fixer(width):
+    """Make a function to adjust device coordinates for lines `width` wide.
+
+    Lines look uniform if their edges fall on pixel boundaries: odd widths
+    are centered on pixel centers, even widths on pixel edges.
+
+    """
+    if width == int(width):
+        if width % 2:
+            return lambda v: math.floor(v) + 0.5
+        else:
+            return round
+    else:
+        return lambda v: (math.floor(2 * v) + 0.5) / 2
+
+
+def fix_points(points, matrix, width):
+    """Adjust user-space points to get uniformly drawn lines.
+
+    `matrix` is the user-to-device transform, as the tuple (xx, yx, xy, yy,
+    x0, y0).  `width` is the line width.  Each point is mapped to device
+    space, adjusted there, and mapped back, with no cairo calls.  Returns a
+    list of (x, y) tuples.
+
+    """
+    xx, yx, xy, yy, x0, y0 = matrix
+    det = xx * yy - xy * yx
+    fix = coord_fixer(width)
+    fixed = []
+    for x, y in points:
+        dx = fix(xx * x + xy * y + x0) - x0
+        dy = fix(yx * x + yy * y + y0) - y0
+        fixed.append(((yy * dx - xy * dy) / det, (xx * dy - yx * dx) / det))
+    return fixed
+
+
+def periodic_copies(matrix, period, origin, size, phases):
+    """Plan how copies of one repeating cell cover a canvas.
+
+    `matrix` is the user-to-device transform (xx, yx, xy, yy, x0, y0), which
+    must be axis-aligned.  `period` is the (width, height) of the cell in user
+    space, and `origin` is the user-space corner of one cell.  `size` is the
+    (width, height) of the canvas in pixels.
+
+    Yields a tuple for each copy of the cell on the canvas: (phase, pixel,
+    region).  `pixel` is the whole device pixel nearest to the copy's origin,
+    and `phase` is the remaining fraction, in units of 1/`phases` pixel.
+    `region` is the (x0, y0, x1, y1) rectangle of whole pixels the copy
+    covers.  The regions exactly cover the canvas, without overlapping.
+
+    """
+    xx, _, _, yy, x0, y0 = matrix
+    pw, ph = period
+    ox, oy = origin
+    width, height = size
+
+    def place(scale, offset, start, step, limit):
+        """Produce (phase, pixel, lo, hi) along one axis."""
+        ends = [(0 - offset) / scale, (limit - offset) / scale]
+        first = math.floor((min(ends) - start) / step)
+        last = math.floor((max(ends) - start) / step)
+        for n in range(first, last + 1):
+            a = scale * (start + n * step) + offset
+            b = a + scale * step
+            lo = max(round(min(a, b)), 0)
+            hi = min(round(max(a, b)), limit)
+            if lo >= hi:
+                continue
+            pixel = math.floor(a)
+            phase = round((a - pixel) * phases)
+            if phase == phases:
+                pixel += 1
+                phase = 0
+            yield phase, pixel, lo, hi
+
+    columns = list(place(xx, x0, ox, pw, width))
+    for qy, py, lo_y, hi_y in place(yy, y0, oy, ph, height):
+        for qx, px, lo_x, hi_x in columns:
+            yield (qx, qy), (px, py), (lo_x, lo_y, hi_x, hi_y)
+
+
 def nice_paths_bounds(paths):
     """Return the (llx, lly, urx, ury) for nicely enclosing the paths."""
     return paths_bounds(paths).expand(percent=2)
 
 
 class Drawing:
-    def __init__(self, width=None, height=None, name=None, bounds=None, bg=(1, 1, 1), format=None):
-        """Create a new Cairo drawing.
+    def __init__(
+        self, width=None, height=None, name=None, bounds=None, bg=(1, 1, 1), format=None,
+        snap=None, backend=None, precision=3, buffer=None, pool=None, lod=0,
+        antialias='best', palette=0, png_level=9, png_strategy=zlib.Z_DEFAULT_STRATEGY,
+        png_filter=0,
+    ):
+        """Create a new drawing.
 
         If `bounds` is provided, it's a Bounds describing the extent of the
         drawing.  Otherwise, provide `width` and `height` to specify a size
@@ -50,6 +161,39 @@ class Drawing:
 
         `bg` is the background color to paint initially.
 
+        `format` is 'png', 'svg', 'svgz', 'rgba', or 'raw'.  'rgba' writes the
+        pixels as straight 8-bit RGBA, row by row, with no header.  'raw'
+        writes Cairo's own premultiplied native-endian ARGB32 words, as fast
+        as possible.  The raster formats are drawn with Cairo.  SVG is
+        streamed to the file by a writer in zellij.svg, unless `backend` is
+        'cairo'.  `precision` is the number of decimal places for SVG
+        coordinates.  With `backend` 'record', nothing is written: the
+        surface is a RecordingSurface to replay later.
+
+        `snap` determines whether points are adjusted to make lines crisp.
+        It's pointless when the drawing isn't axis-aligned, so the default is
+        to snap unless writing SVG without Cairo.
+
+        `buffer` is a writable buffer (a bytearray, NumPy array, or mmap) of at
+        least ``stride * height`` bytes to draw the pixels into, where
+        `stride` is from `image_stride`.  With no `name`, nothing is written
+        by `finish`: use `pixels` or `array` to get the image.  If `pool` is a
+        SurfacePool, the buffer is taken from it instead, and is available as
+        `self.buffer` to give back when the drawing is done.
+
+        Paths entirely outside the drawing aren't drawn at all.  If `lod`
+        isn't zero, paths smaller than `lod` device pixels are drawn as dots,
+        and at most one dot in each `lod`-sized square.  That's for quick
+        previews: the default is to draw every path in full.
+
+        `antialias` is the name of a Cairo antialiasing mode, like 'best' or
+        'fast'.
+
+        If `palette` isn't zero, PNG files are written with 8-bit indexed
+        color, with at most that many colors in the palette.  Those are
+        compressed with zlib `png_level` and `png_strategy`, after the rows
+        are filtered with PNG filter type `png_filter`.
+
         """
         if bounds is None:
             assert width is not None
@@ -61,15 +205,52 @@ class Drawing:
         self.height = int(self.bounds.height)
 
         self.name, self.format = name_and_format(name, format)
-
-        if self.format == 'png':
-            self.surface = cairo.ImageSurface(cairo.Format.ARGB32, self.width, self.height)
-        elif self.format == 'svg':
-            self.surface = cairo.SVGSurface(self.name, self.width, self.height)
-        self.ctx = cairo.Context(self.surface)
-        self.ctx.set_antialias(cairo.Antialias.BEST)
-        self.ctx.set_line_cap(cairo.LineCap.ROUND)
-        self.ctx.set_line_join(cairo.LineJoin.MITER)
+        if backend is None:
+            backend = 'svg' if self.format in ['svg', 'svgz'] else 'cairo'
+        self.backend = backend
+        if snap is None:
+            snap = (backend == 'cairo')
+        self.snap = snap
+        self.lod = lod
+        self.palette = palette
+        self.png_options = dict(level=png_level, strategy=png_strategy, filter_type=png_filter)
+
+        if backend in ['svg', 'record']:
+            if backend == 'svg':
+                self.surface = SvgSurface(self.name, self.width, self.height, precision=precision)
+            else:
+                self.surface = RecordingSurface(self.width, self.height)
+            self.ctx = SvgContext(self.surface)
+            self.ctx.set_line_cap("round")
+            self.ctx.set_line_join("miter")
+        else:
+            if cairo is None:
+                raise RuntimeError(f"Drawing {self.format} needs pycairo")
+            if self.format in RASTER_FORMATS:
+                if pool is not None:
+                    buffer = pool.get(self.width, self.height)
+                if buffer is not None:
+                    self.surface = cairo.ImageSurface.create_for_data(
+                        buffer, cairo.Format.ARGB32, self.width, self.height,
+                        image_stride(self.width),
+                    )
+                else:
+                    self.surface = cairo.ImageSurface(cairo.Format.ARGB32, self.width, self.height)
+            elif buffer is not None:
+                raise ValueError(f"Can't draw {self.format} into a buffer")
+            elif self.format == 'recording':
+                self.surface = cairo.RecordingSurface(
+                    cairo.Content.COLOR_ALPHA, cairo.Rectangle(0, 0, self.width, self.height),
+                )
+            elif self.format == 'svg':
+                self.surface = cairo.SVGSurface(self.name, self.width, self.height)
+            else:
+                raise ValueError(f"Cairo can't draw {self.format}")
+            self.ctx = cairo.Context(self.surface)
+            self.ctx.set_antialias(getattr(cairo.Antialias, antialias.upper()))
+            self.ctx.set_line_cap(cairo.LineCap.ROUND)
+            self.ctx.set_line_join(cairo.LineJoin.MITER)
+        self.buffer = buffer
 
         self.translate(-self.bounds.llx, -self.bounds.lly)
 
@@ -78,6 +259,11 @@ class Drawing:
             with self.style(rgb=bg):
                 self.rectangle(self.bounds.llx, self.bounds.lly, self.width, self.height)
                 self.fill()
+        elif pool is not None and buffer is not None:
+            # Pooled memory still has an old picture on it.
+            self.set_operator(cairo.Operator.CLEAR)
+            self.paint()
+            self.set_operator(cairo.Operator.OVER)
 
     def __getattr__(self, name):
         """Use the drawing like a context, or a surface."""
@@ -86,24 +272,74 @@ class Drawing:
         except AttributeError:
             return getattr(self.surface, name)
 
-    def _fix_coord(self, v):
-        """Adjust a coordinate to get uniformly drawn lines."""
-        width = self.get_line_width()
-        if width == int(width):
-            if width % 2:
-                return math.floor(v) + 0.5
-            else:
-                return round(v)
-        else:
-            return (math.floor(2 * v) + 0.5) / 2
+    def fix_points(self, points):
+        """Adjust points to get uniformly drawn lines, if we are snapping.
+
+        The transform and line width are read once for all the points.
+
+        """
+        if not self.snap:
+            return points
+        m = self.ctx.get_matrix()
+        return fix_points(points, (m.xx, m.yx, m.xy, m.yy, m.x0, m.y0), self.get_line_width())
 
     def _fix_point(self, x, y):
         """Adjust a point to get uniformly drawn lines."""
-        dx, dy = self.ctx.user_to_device(x, y)
-        dx = self._fix_coord(dx)
-        dy = self._fix_coord(dy)
-        x, y = self.ctx.device_to_user(dx, dy)
-        return x, y
+        if not self.snap:
+            return x, y
+        return self.fix_points([(x, y)])[0]
+
+    def polyline(self, points, append=False, close=False):
+        """Add a series of connected points to the current path.
+
+        If `append` is true, the first point is connected to the current point.
+        If `close` is true, the polyline is closed back to its start.
+
+        """
+        ctx = self.ctx
+        points = self.fix_points(points)
+        (ctx.line_to if append else ctx.move_to)(*points[0])
+        for x, y in points[1:]:
+            ctx.line_to(x, y)
+        if close:
+            ctx.close_path()
+
+    def device_to_user_length(self, length):
+        """Convert a length in device pixels to user space."""
+        return math.hypot(*self.ctx.device_to_user_distance(length, 0))
+
+    def viewport(self):
+        """The Bounds in user space of everything that can be seen."""
+        corners = Bounds(0, 0, self.width, self.height).corners()
+        return Bounds.points([Point(*self.device_to_user(x, y)) for x, y in corners])
+
+    def visible_paths(self, paths, width):
+        """Cut down the paths to draw with lines `width` wide.
+
+        Paths that can't be seen are skipped.  Paths smaller than `self.lod`
+        pixels are replaced with a dot at their center, unless there's already
+        a dot in the same `lod`-sized square.  No Cairo calls are made per path.
+
+        """
+        llx, lly, urx, ury = self.viewport()
+        pad = width * MITER_REACH
+        llx, lly, urx, ury = llx - pad, lly - pad, urx + pad, ury + pad
+        tiny = self.device_to_user_length(self.lod) if self.lod else 0
+        dots = set()
+        visible = []
+        for path in paths:
+            bounds = path.bounds()
+            if bounds.urx < llx or bounds.llx > urx or bounds.ury < lly or bounds.lly > ury:
+                continue
+            if bounds.width < tiny and bounds.height < tiny:
+                center = Point((bounds.llx + bounds.urx) / 2, (bounds.lly + bounds.ury) / 2)
+                cell = (center.x // tiny, center.y // tiny)
+                if cell in dots:
+                    continue
+                dots.add(cell)
+                path = Dot(center)
+            visible.append(path)
+        return visible
 
     def perimeter(self):
         """The Path of the edges of the drawing, in user space."""
@@ -131,26 +367,260 @@ class Drawing:
         return (self.width, self.height)
 
     def circle(self, xc, yc, radius):
+        self.new_sub_path()
         self.arc(xc, yc, radius, 0, math.pi * 2)
 
-    def multi_stroke(self, paths, styles):
+    def snap_key(self, width):
+        """A key for how points are snapped for lines `width` wide.
+
+        Geometry built for one width can be reused for another with the same
+        key.
+
+        """
+        if not self.snap:
+            return None
+        if width == int(width):
+            return int(width) % 2
+        return "half"
+
+    def compile_paths(self, paths):
+        """Build `paths` into a cairo path object for replaying with `append_path`.
+
+        Points are snapped for the current line width.  The current path is
+        left empty.
+
+        """
+        self.new_path()
+        for path in paths:
+            path.draw(self)
+        compiled = self.copy_path()
+        self.new_path()
+        return compiled
+
+    def multi_stroke(self, paths, styles, period=None):
+        """Stroke all the paths, once for each (width, color) style.
+
+        Paths are stroked together, one cairo stroke per color.  If `color` is
+        callable, it's called once per path, and the paths are grouped into
+        buckets by the color they get.
+
+        The geometry for constant colors is built once, and replayed for each
+        style that snaps points the same way.
+
+        If the paths repeat in a rectangle of user-space size `period`, a PNG
+        drawing may render one cell and copy it across the canvas.
+
+        """
+        if period is not None and self._stroke_repeated(paths, styles, period):
+            return
+
+        compiled = {}
+        visible = None
         for width, color in styles:
             self.set_line_width(width)
-            for path in paths:
-                path.draw(self)
-                if callable(color):
-                    self.set_source_rgb(*color())
-                else:
-                    self.set_source_rgb(*color)
+            if callable(color):
+                # Every path gets a color, so random colors don't depend on
+                # what can be seen.
+                buckets = collections.defaultdict(list)
+                for path in paths:
+                    buckets[tuple(color())].append(path)
+                for rgb, bucket in buckets.items():
+                    for path in self.visible_paths(bucket, width):
+                        path.draw(self)
+                    self.set_source_rgb(*rgb)
+                    self.stroke()
+            else:
+                key = self.snap_key(width)
+                if key not in compiled:
+                    if visible is None:
+                        visible = self.visible_paths(paths, max(w for w, _ in styles))
+                    compiled[key] = self.compile_paths(visible)
+                self.append_path(compiled[key])
+                self.set_source_rgb(*color)
                 self.stroke()
 
+    def _stroke_repeated(self, paths, styles, period, phases=4):
+        """Stroke periodic paths by rendering one cell and copying it.
+
+        A cell is rendered offscreen for each sub-pixel position the copies
+        need, to 1/`phases` of a pixel, and painted into place with whole-pixel
+        offsets.  Returns False if the drawing can't be made this way, or
+        there's nothing to gain.
+
+        """
+        if self.backend != 'cairo' or self.format not in RASTER_FORMATS:
+            return False
+        if any(callable(color) for _, color in styles):
+            return False
+        m = self.ctx.get_matrix()
+        if m.xy or m.yx:
+            return False
+
+        pw, ph = period
+        origin = Point(*self.device_to_user(self.width / 2, self.height / 2))
+        matrix = (m.xx, m.yx, m.xy, m.yy, m.x0, m.y0)
+        copies = list(periodic_copies(matrix, period, origin, (self.width, self.height), phases))
+        if len({phase for phase, _, _ in copies}) * 2 > len(copies):
+            return False
+
+        # The paths that can be seen in the cell, including its one-pixel
+        # border, the line widths, and a little more for antialiasing.
+        extra = max(width for width, _ in styles) + 3 / min(abs(m.xx), abs(m.yy))
+        near = Bounds(origin.x - extra, origin.y - extra, origin.x + pw + extra, origin.y + ph + extra)
+        cell_paths = [path for path in paths if path.bounds().overlap(near)]
+
+        # Where a cell surface is placed relative to its copy's pixel.
+        ex = math.floor(min(0, m.xx * pw)) - 1
+        ey = math.floor(min(0, m.yy * ph)) - 1
+        cell_size = (math.ceil(abs(m.xx * pw)) + 4, math.ceil(abs(m.yy * ph)) + 4)
+
+        cells = {}
+        with self.saved():
+            self.identity_matrix()
+            for phase, (px, py), (x0, y0, x1, y1) in copies:
+                if phase not in cells:
+                    cell = Drawing(*cell_size, bg=None, snap=self.snap)
+                    cell.set_antialias(self.get_antialias())
+                    cell.set_line_cap(self.get_line_cap())
+                    cell.set_line_join(self.get_line_join())
+                    cell.set_dash(*self.get_dash())
+                    qx, qy = phase
+                    cell.set_matrix(cairo.Matrix(
+                        m.xx, 0, 0, m.yy,
+                        qx / phases - m.xx * origin.x - ex,
+                        qy / phases - m.yy * origin.y - ey,
+                    ))
+                    cell.multi_stroke(cell_paths, styles)
+                    cells[phase] = cell.surface
+                self.set_source_surface(cells[phase], px + ex, py + ey)
+                self.rectangle(x0, y0, x1 - x0, y1 - y0)
+                self.fill()
+        return True
+
+    def replay(self, recording):
+        """Draw the shapes from a RecordingSurface.
+
+        The recording's device space is this drawing's user space.
+
+        """
+        ctx = self.ctx
+        with self.saved():
+            for shape in recording.shapes:
+                for _, ops in shape.subpaths:
+                    for op, next_op in zip(ops, ops[1:] + [None]):
+                        kind = op[0]
+                        if kind == "M":
+                            if next_op and next_op[0] == "A":
+                                # The arc will start its own subpath.
+                                ctx.new_sub_path()
+                            else:
+                                ctx.move_to(op[1], op[2])
+                        elif kind == "L":
+                            ctx.line_to(op[1], op[2])
+                        elif kind == "Z":
+                            ctx.close_path()
+                        else:
+                            _, xc, yc, radius, angle1, angle2, negative = op
+                            (ctx.arc_negative if negative else ctx.arc)(xc, yc, radius, angle1, angle2)
+                if shape.kind == "stroke":
+                    style = shape.style
+                    ctx.set_source_rgba(*style.rgba)
+                    ctx.set_line_width(style.width)
+                    ctx.set_line_cap(self._line_style("LineCap", style.cap))
+                    ctx.set_line_join(self._line_style("LineJoin", style.join))
+                    ctx.set_dash(style.dashes, style.dash_offset)
+                    ctx.stroke()
+                else:
+                    ctx.set_source_rgba(*shape.style)
+                    ctx.fill()
+
+    def layer(self):
+        """A new transparent drawing to record a layer on.
+
+        The layer has the same size and transform as this drawing.  Once it's
+        drawn, `paint_layer` puts it on this drawing, or any other drawing of
+        the same size, much faster than drawing it again.  With Cairo, the
+        layer is a cairo RecordingSurface; otherwise a zellij one.
+
+        """
+        if self.backend == 'cairo':
+            layer = Drawing(bounds=self.bounds, bg=None, format='recording', snap=self.snap)
+        else:
+            layer = Drawing(bounds=self.bounds, bg=None, backend='record', snap=self.snap)
+        layer.set_matrix(self.get_matrix())
+        layer.set_line_cap(self.get_line_cap())
+        layer.set_line_join(self.get_line_join())
+        return layer
+
+    def paint_layer(self, layer):
+        """Paint a layer made by `layer` onto this drawing."""
+        with self.saved():
+            self.identity_matrix()
+            if self.backend == 'cairo':
+                self.set_source_surface(layer.surface, 0, 0)
+                self.paint()
+            else:
+                self.replay(layer.surface)
+
+    def _line_style(self, kind, name):
+        """Convert a line cap or join name for our context."""
+        if self.backend == 'cairo':
+            return getattr(getattr(cairo, kind), name.upper())
+        return name
+
+    def render(self, draw_func, *args):
+        """Draw with `draw_func(self, *args)`, and finish the drawing."""
+        draw_func(self, *args)
+        self.finish()
+
     def finish(self):
-        if self.format == 'png':
+        if self.name is None:
+            self.surface.flush()
+        elif self.format == 'png' and self.palette:
+            with open(self.name, "wb") as f:
+                write_indexed_png(
+                    f, self.pixels(), self.width, self.height, self.surface.get_stride(),
+                    colors=self.palette, **self.png_options,
+                )
+        elif self.format == 'png':
             self.write_to_png(self.name)
-        elif self.format == 'svg':
+        elif self.format in ['rgba', 'raw']:
+            with open(self.name, "wb") as f:
+                f.write(self.pixels() if self.format == 'raw' else self.rgba())
+        else:
             self.surface.flush()
             self.surface.finish()
 
+    def pixels(self):
+        """The drawing's ARGB32 pixels, as a memoryview without copying.
+
+        Each pixel is a native-endian 32-bit word of premultiplied alpha, red,
+        green, blue.  Rows are `image_stride(width)` bytes apart.
+
+        """
+        self.surface.flush()
+        return memoryview(self.surface.get_data())
+
+    def array(self):
+        """The drawing's pixels as a (height, width, 4) NumPy array, without copying.
+
+        The channels are in Cairo's order: premultiplied BGRA on
+        little-endian machines.  Drawing more changes the array.
+
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("Drawing.array needs numpy") from None
+        return numpy.ndarray(
+            shape=(self.height, self.width, 4), dtype=numpy.uint8, buffer=self.pixels(),
+            strides=(self.surface.get_stride(), 4, 1),
+        )
+
+    def rgba(self):
+        """The drawing's pixels as straight RGBA bytes, with no row padding."""
+        return argb32_to_rgba(self.pixels(), self.width, self.height, self.surface.get_stride())
+
     @contextlib.contextmanager
     def style(self, rgb=None, width=None, dash=None, dash_offset=0):
         """Set and restore the drawing style."""
@@ -177,7 +647,7 @@ class Drawing:
 
     def draw_paths(self, paths, **style_kwargs):
         with self.style(**style_kwargs):
-            for path in paths:
+            for path in self.visible_paths(paths, self.get_line_width()):
                 path.draw(self)
             self.stroke()
 
@@ -186,19 +656,19 @@ class Drawing:
             for (x1, y1), (x2, y2) in segments:
                 self.move_to(x1, y1)
                 self.line_to(x2, y2)
-                self.stroke()
+            self.stroke()
 
     def circle_points(self, points, radius=5, **style_kwargs):
         with self.style(**style_kwargs):
             for x, y in points:
                 self.circle(x, y, radius)
-                self.stroke()
+            self.stroke()
 
     def fill_points(self, points, radius=5, **style_kwargs):
         with self.style(**style_kwargs):
             for x, y in points:
                 self.circle(x, y, radius)
-                self.fill()
+            self.fill()
 
     def cross_points(self, points, radius=5, rotate=0, **style_kwargs):
         with self.style(**style_kwargs):
@@ -214,22 +684,151 @@ class Drawing:
                     self.line_to(0, 2 * radius)
                     self.move_to(0, -radius)
                     self.line_to(0, -2 * radius)
-                    self.stroke()
+            self.stroke()
+
+
+class StandInDrawing:
+    """Enough of a Drawing to compute geometry, without any pixels.
+
+    It has the size, transform, and perimeter of a drawing, for output that
+    is rendered later in pieces.  The pieces are drawn by `render`.
+
+    """
+    def __init__(self, width, height, name=None, format=None, snap=True):
+        self.width = width
+        self.height = height
+        self.bounds = Bounds(0, 0, width, height)
+        self.name, self.format = name_and_format(name, format)
+        self.snap = snap
+        self.transform = Affine.identity()
+
+    def translate(self, dx, dy):
+        self.transform *= Affine.translation(dx, dy)
+
+    def rotate(self, degrees):
+        self.transform *= Affine.rotation(degrees)
+
+    def scale(self, sx, sy):
+        self.transform *= Affine.scale(sx, sy)
+
+    def device_to_user(self, x, y):
+        return ~self.transform * (x, y)
+
+    def device_to_user_length(self, length):
+        """Convert a length in device pixels to user space."""
+        x0, y0 = self.device_to_user(0, 0)
+        x1, y1 = self.device_to_user(length, 0)
+        return math.hypot(x1 - x0, y1 - y0)
+
+    def perimeter(self):
+        """The Path of the edges of the drawing, in user space."""
+        return Path([Point(*self.device_to_user(*pt)) for pt in self.bounds.corners()])
+
+
+class SurfacePool:
+    """Pixel memory for ARGB32 drawings, to reuse instead of allocating anew.
+
+    Safe to use from more than one thread.
+
+    """
+    def __init__(self):
+        self.free = collections.defaultdict(list)
+        self.lock = threading.Lock()
+
+    def get(self, width, height):
+        """A buffer for a `width` x `height` image, reused if one is free."""
+        size = image_stride(width) * height
+        with self.lock:
+            if self.free[size]:
+                return self.free[size].pop()
+        return bytearray(size)
+
+    def put(self, buffer):
+        """Give back a buffer.  Nothing may be drawing on it any more."""
+        with self.lock:
+            self.free[len(buffer)].append(buffer)
+
+
+class SequenceFrame(Drawing):
+    """One drawing from a DrawingSequence, written in the background when finished."""
+    def __init__(self, sequence, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sequence = sequence
+
+    def finish(self):
+        self.sequence.write(self)
 
 
 class DrawingSequence:
-    def __init__(self, name, *args, **kwargs):
+    """Numbered drawings, encoded and written by background threads.
+
+    The frame number is put after the underscore in the file name of `name`.  Other
+    arguments are for each Drawing.
+
+    Finishing a frame hands it to one of `workers` threads to write, so the
+    next frame can be drawn meanwhile.  At most `pending` frames can be
+    unwritten at once, including the one being drawn: getting another waits
+    until one is written.  Their pixel memory is reused for later frames.
+    Call `close` to wait for the last frames to be written.
+
+    `background` is a function to draw the static layers of the frames, as
+    `background(dwg)`.  It's called once, to record a layer that is painted
+    onto every frame.
+
+    """
+    def __init__(self, name, *args, workers=2, pending=4, background=None, **kwargs):
         self.name = name
         self.args = args
         self.kwargs = kwargs
+        self.background = background
+        self.background_layer = None
+        self.pool = SurfacePool()
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self.slots = threading.BoundedSemaphore(pending)
+        self.futures = []
 
     def __iter__(self):
-        nums = itertools.count()
-        while True:
-            num = next(nums)
-            name = self.name.replace("_", f"_{num:04d}")
-            dwg = Drawing(name=name, *self.args, **self.kwargs)
+        head, tail = os.path.split(self.name)
+        for num in itertools.count():
+            name = os.path.join(head, tail.replace("_", f"_{num:04d}"))
+            self.slots.acquire()
+            self.check()
+            dwg = SequenceFrame(self, name=name, pool=self.pool, *self.args, **self.kwargs)
             dwg.num = num
+            if self.background is not None:
+                if self.background_layer is None:
+                    self.background_layer = dwg.layer()
+                    self.background(self.background_layer)
+                dwg.paint_layer(self.background_layer)
             sys.stdout.write(".")
             sys.stdout.flush()
             yield dwg
+
+    def write(self, dwg):
+        """Write a finished frame in the background."""
+        dwg.surface.flush()
+        self.futures.append(self.executor.submit(self._write, dwg))
+
+    def _write(self, dwg):
+        try:
+            Drawing.finish(dwg)
+        finally:
+            if dwg.buffer is not None:
+                dwg.surface.finish()
+                self.pool.put(dwg.buffer)
+            self.slots.release()
+
+    def check(self):
+        """Raise the exception from any frame that failed to be written."""
+        still_pending = []
+        for future in self.futures:
+            if future.done():
+                future.result()
+            else:
+                still_pending.append(future)
+        self.futures = still_pending
+
+    def close(self):
+        """Wait for all the finished frames to be written."""
+        self.executor.shutdown(wait=True)
+        self.check()
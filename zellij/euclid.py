@@ -5,7 +5,8 @@ Simple 2D Euclidean geometric primitives.
 from collections import namedtuple
 import math
 
-from .postulates import adjacent_pairs, overlap, fbetween, isclose, perturbed
+from .postulates import adjacent_pairs, overlap, isclose, perturbed
+from .predicates import orient2d, orient2d_exact
 
 
 class BadGeometry(Exception):
@@ -21,22 +22,39 @@ class CoincidentLines(BadGeometry):
     pass
 
 
+# How far from straight can three points be, and still be collinear?  This is
+# the sine of the angle between the lines, so it means the same thing at any
+# scale.
+COLLINEAR_SINE = 1e-8
+
+# Points this close together, relative to the size of the figure they are in,
+# are treated as one point.
+COINCIDENT_FRACTION = 1e-9
+
+# Results from the exception-free `intersect_status` methods.  The status
+# comes with a point, which is None unless the status is INTERSECTING.
+INTERSECTING = 0    # The lines or segments cross at one point.
+PARALLEL = 1        # Lines only: parallel, never meeting.
+COINCIDENT = 2      # Lines: the same line. Segments: overlapping.
+DISJOINT = 3        # Segments only: no point in common.
+
+
 class Point(namedtuple("Point", ["x", "y"])):
     """A point in 2D."""
 
+    __slots__ = ()
+
     def __repr__(self):
         return  f"Point({self.x}, {self.y})"
 
     def is_close(self, other):
         """Are two points close enough to be considered the same?"""
-        assert isinstance(other, Point)
         x1, y1 = self
         x2, y2 = other
         return isclose(x1, x2) and isclose(y1, y2)
 
     def distance(self, other):
         """Compute the distance from this Point to another Point."""
-        assert isinstance(other, Point)
         x1, y1 = self
         x2, y2 = other
         return math.hypot(x2 - x1, y2 - y1)
@@ -52,10 +70,25 @@ class Point(namedtuple("Point", ["x", "y"])):
 
 
 def line_collinear(p1, p2, p3):
-    """Are three points on the same line, regardless of order?"""
+    """Are three points on the same line, regardless of order?
+
+    Exactly collinear points are found by `orient2d`.  Points computed in
+    floating point are rarely exactly on a line, so a small angle is allowed
+    too.  The tolerance is relative to the size of the triangle the points
+    make, so the answer doesn't depend on the scale of the drawing.
+    """
+    if orient2d(p1, p2, p3) == 0:
+        return True
     (x1, y1), (x2, y2), (x3, y3) = p1, p2, p3
-    # https://stackoverflow.com/questions/3813681/checking-to-see-if-3-points-are-on-the-same-line
-    return isclose((y1 - y2) * (x1 - x3), (y1 - y3) * (x1 - x2))
+    dx2, dy2 = x2 - x1, y2 - y1
+    dx3, dy3 = x3 - x1, y3 - y1
+    len2 = math.hypot(dx2, dy2)
+    len3 = math.hypot(dx3, dy3)
+    if abs(dx2 * dy3 - dy2 * dx3) <= COLLINEAR_SINE * len2 * len3:
+        return True
+    # If two of the points are on top of each other, the angles mean nothing.
+    len23 = math.hypot(x3 - x2, y3 - y2)
+    return min(len2, len3, len23) <= COINCIDENT_FRACTION * max(len2, len3, len23)
 
 
 def collinear(p1, p2, p3):
@@ -65,11 +98,55 @@ def collinear(p1, p2, p3):
     The points must be in order: p2 must be between p1 and p3 for this to
     return True.
     """
+    return _between(p1, p2, p3) and line_collinear(p1, p2, p3)
+
+
+def _between(p1, p2, p3):
+    """Is p2 between p1 and p3, measured along the line from p1 to p3?
+
+    p2 can be past the ends by COINCIDENT_FRACTION of the distance.
+    """
     (x1, y1), (x2, y2), (x3, y3) = p1, p2, p3
-    if fbetween(x1, x2, x3) and fbetween(y1, y2, y3):
-        return line_collinear(p1, p2, p3)
-    else:
-        return False
+    dx, dy = x3 - x1, y3 - y1
+    if dx == dy == 0:
+        return x2 == x1 and y2 == y1
+    slack = COINCIDENT_FRACTION * (dx * dx + dy * dy)
+    return (x2 - x1) * dx + (y2 - y1) * dy >= -slack and (x3 - x2) * dx + (y3 - y2) * dy >= -slack
+
+
+def _crossing(p3, dx34, dy34, d3, d4):
+    """The point where a segment from p3 crosses a line.
+
+    The segment goes by (dx34, dy34), and `d3` and `d4` are its ends'
+    distances from the line, of opposite signs, in any consistent unit.
+    """
+    t = float(d3 / (d3 - d4))
+    return Point(p3[0] + t * dx34, p3[1] + t * dy34)
+
+
+def _line_intersection(p1, p2, p3, p4):
+    """Intersect the line through p1,p2 with the line through p3,p4.
+
+    Returns (status, point).
+    """
+    # https://en.wikipedia.org/wiki/Line%E2%80%93line_intersection
+    (x1, y1), (x2, y2), (x3, y3), (x4, y4) = p1, p2, p3, p4
+
+    dx12, dy12 = x1 - x2, y1 - y2
+    dx34, dy34 = x3 - x4, y3 - y4
+    denom = dx12 * dy34 - dy12 * dx34
+    if abs(denom) <= COLLINEAR_SINE * math.hypot(dx12, dy12) * math.hypot(dx34, dy34):
+        if line_collinear(p1, p2, p3) and line_collinear(p1, p2, p4):
+            return COINCIDENT, None
+        return PARALLEL, None
+
+    a = x1 * y2 - y1 * x2
+    b = x3 * y4 - y3 * x4
+
+    xi = (a * dx34 - b * dx12) / denom
+    yi = (a * dy34 - b * dy12) / denom
+
+    return INTERSECTING, Point(xi, yi)
 
 
 def along_the_way(p1, p2, t):
@@ -80,6 +157,8 @@ def along_the_way(p1, p2, t):
 class Line(namedtuple("Line", ["p1", "p2"])):
     """A line in 2D, defined by two Points."""
 
+    __slots__ = ()
+
     def angle(self):
         """The angle in degrees this line makes to the horizontal."""
         (x1, y1), (x2, y2) = self
@@ -91,25 +170,31 @@ class Line(namedtuple("Line", ["p1", "p2"])):
 
         Raises BadGeometry if the lines are parallel or coincident.
         """
-        # https://en.wikipedia.org/wiki/Line%E2%80%93line_intersection
         assert isinstance(other, Line)
-        (x1, y1), (x2, y2) = self
-        (x3, y3), (x4, y4) = other
-
-        denom = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
-        if isclose(denom, 0):
-            if line_collinear(self.p1, self.p2, other.p1):
-                raise CoincidentLines("No intersection of identical lines")
-            else:
-                raise ParallelLines("No intersection of parallel lines")
+        status, pt = _line_intersection(self.p1, self.p2, other.p1, other.p2)
+        if status == COINCIDENT:
+            raise CoincidentLines("No intersection of identical lines")
+        elif status == PARALLEL:
+            raise ParallelLines("No intersection of parallel lines")
+        return pt
+
+    def intersect_status(self, other):
+        """
+        Find the point where this Line and another intersect, without raising.
 
-        a = x1 * y2 - y1 * x2
-        b = x3 * y4 - y3 * x4
+        Returns (status, point): INTERSECTING and the point, or PARALLEL or
+        COINCIDENT and None.
+        """
+        return _line_intersection(self.p1, self.p2, other.p1, other.p2)
 
-        xi = (a * (x3 - x4) - b * (x1 - x2)) / denom
-        yi = (a * (y3 - y4) - b * (y1 - y2)) / denom
+    def side(self, point):
+        """Which side of this Line is `point` on?
 
-        return Point(xi, yi)
+        Returns 1 for the left (counter-clockwise from p1 to p2), -1 for the
+        right, and 0 if the point is exactly on the line.  This is exact, with
+        no tolerance.
+        """
+        return orient2d(self.p1, self.p2, point)
 
     def offset(self, distance):
         """Create another Line `distance` from this one."""
@@ -153,14 +238,50 @@ class Line(namedtuple("Line", ["p1", "p2"])):
         return Line(thru, Point(x4, y4))
 
 
-class Segment(namedtuple('Segment', 'p1 p2')):
-    """A segment of a line, from p1 to p2."""
+class Segment:
+    """A segment of a line, from p1 to p2.
+
+    Segments are equal regardless of their direction, to each other and to
+    pairs of points as tuples or lists. The endpoints are kept
+    in the order given (`sort_along` depends on it), but the direction-free
+    key and its hash are computed once, since Segments are used heavily as
+    dict keys.  Segments are immutable: don't assign to their attributes.
+
+    """
+
+    __slots__ = ('p1', 'p2', '_key', '_hash')
+
+    def __init__(self, p1, p2):
+        self.p1 = p1
+        self.p2 = p2
+        self._key = (p1, p2) if p1 <= p2 else (p2, p1)
+        self._hash = hash(self._key)
+
+    def __repr__(self):
+        return f"Segment({self.p1!r}, {self.p2!r})"
 
     def __eq__(self, other):
-        return sorted(self) == sorted(other)
+        if isinstance(other, Segment):
+            return self._hash == other._hash and self._key == other._key
+        if isinstance(other, (tuple, list)) and len(other) == 2:
+            p1, p2 = other
+            return self._key == ((p1, p2) if p1 <= p2 else (p2, p1))
+        return NotImplemented
 
     def __hash__(self):
-        return hash(tuple(sorted(self)))
+        return self._hash
+
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        return iter((self.p1, self.p2))
+
+    def __getitem__(self, idx):
+        return (self.p1, self.p2)[idx]
+
+    def __reduce__(self):
+        return (Segment, (self.p1, self.p2))
 
     def intersect(self, other):
         """
@@ -168,33 +289,90 @@ class Segment(namedtuple('Segment', 'p1 p2')):
         if there is no point of intersection, or BadGeometry if the answer is
         undefined.
         """
-        l1 = Line(*self)
-        l2 = Line(*other)
-        try:
-            p = l1.intersect(l2)
-        except ParallelLines:
-            return None
-        except CoincidentLines:
-            # If the segments overlap, BadGeometry, else, None
-            if overlap(self.p1[0], self.p2[0], other.p1[0], other.p2[0]):
-                raise CoincidentLines("Segments overlap", self, other)
-            else:
-                return None
-        if collinear(self.p1, p, self.p2) and collinear(other.p1, p, other.p2):
-            return p
-        else:
-            return None
+        status, p = self.intersect_status(other)
+        if status == COINCIDENT:
+            raise CoincidentLines("Segments overlap", self, other)
+        return p
+
+    def intersect_status(self, other):
+        """
+        Find the point where this Segment and another intersect, without raising.
+
+        Returns (status, point): INTERSECTING and the point, or DISJOINT or
+        COINCIDENT (the segments overlap) and None.
+        """
+        (x1, y1), (x2, y2) = p1, p2 = self.p1, self.p2
+        (x3, y3), (x4, y4) = p3, p4 = other.p1, other.p2
+        dx12, dy12 = x2 - x1, y2 - y1
+        dx34, dy34 = x4 - x3, y4 - y3
+
+        # Points closer than `near` to each other or to a segment can touch.
+        # It is relative to the size of the segments, and far larger than
+        # the rounding in the sums below.
+        span = abs(dx12) + abs(dy12) + abs(dx34) + abs(dy34)
+        near = COLLINEAR_SINE * span
+        if (
+            min(x1, x2) > max(x3, x4) + near or max(x1, x2) < min(x3, x4) - near or
+            min(y1, y2) > max(y3, y4) + near or max(y1, y2) < min(y3, y4) - near
+        ):
+            return DISJOINT, None
+
+        # Which side of each segment the other's ends are on, times the
+        # segment's length.
+        d1 = dx34 * (y1 - y3) - dy34 * (x1 - x3)
+        d2 = dx34 * (y2 - y3) - dy34 * (x2 - x3)
+        d3 = dx12 * (y3 - y1) - dy12 * (x3 - x1)
+        d4 = dx12 * (y4 - y1) - dy12 * (x4 - x1)
+        near34 = near * (abs(dx34) + abs(dy34))
+        near12 = near * (abs(dx12) + abs(dy12))
+        if (
+            (d1 > near34 and d2 > near34) or (d1 < -near34 and d2 < -near34) or
+            (d3 > near12 and d4 > near12) or (d3 < -near12 and d4 < -near12)
+        ):
+            # Both ends of one segment are clearly on one side of the other.
+            return DISJOINT, None
+
+        if min(abs(d1), abs(d2)) > near34 and min(abs(d3), abs(d4)) > near12:
+            # Each segment clearly straddles the other.
+            return INTERSECTING, _crossing(p3, dx34, dy34, d3, d4)
+        if (
+            orient2d(p3, p4, p1) * orient2d(p3, p4, p2) < 0 and
+            orient2d(p1, p2, p3) * orient2d(p1, p2, p4) < 0
+        ):
+            # Each segment strictly straddles the other, by a hair.
+            if not (d3 < 0 < d4 or d4 < 0 < d3):
+                d3, d4 = orient2d_exact(p1, p2, p3), orient2d_exact(p1, p2, p4)
+            return INTERSECTING, _crossing(p3, dx34, dy34, d3, d4)
+
+        # Touching at an end, or nearly: decide with a tolerance, since
+        # computed endpoints are rarely exactly on the other segment.
+        status, p = _line_intersection(p1, p2, p3, p4)
+        if status == INTERSECTING:
+            if collinear(p1, p, p2) and collinear(p3, p, p4):
+                return INTERSECTING, p
+        elif status == COINCIDENT:
+            if overlap(p1[0], p2[0], p3[0], p4[0]) and overlap(p1[1], p2[1], p3[1], p4[1]):
+                return COINCIDENT, None
+        return DISJOINT, None
 
     def touches(self, other):
         """
         Does this segment touch another? True includes the cases that segments
         intersect, or are coincident.
         """
-        try:
-            pt = self.intersect(other)
-        except CoincidentLines:
-            return True
-        return pt is not None
+        return self.intersect_status(other)[0] != DISJOINT
+
+    def distance(self, point):
+        """The distance from `point` to the nearest point of this Segment."""
+        (x1, y1), (x2, y2) = self.p1, self.p2
+        x3, y3 = point
+        dx, dy = x2 - x1, y2 - y1
+        len2 = dx * dx + dy * dy
+        if len2 == 0:
+            return math.hypot(x3 - x1, y3 - y1)
+        t = ((x3 - x1) * dx + (y3 - y1) * dy) / len2
+        t = max(0, min(1, t))
+        return math.hypot(x3 - (x1 + t * dx), y3 - (y1 + t * dy))
 
     def sort_along(self, points):
         """Sort `points` so that they are ordered from p1 to p2.
@@ -208,6 +386,8 @@ class Segment(namedtuple('Segment', 'p1 p2')):
 class Bounds(namedtuple('Bounds', 'llx lly urx ury')):
     """A rectangle bounding something in the plane."""
 
+    __slots__ = ()
+
     @classmethod
     def points(cls, pts):
         """The Bounds for a collection of points."""
@@ -279,5 +459,8 @@ class EmptyBounds:
 
     This is only useful for starting a chain of |= operations.
     """
+
+    __slots__ = ()
+
     def __or__(self, other):
         return other
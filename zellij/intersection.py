@@ -5,35 +5,55 @@ import poly_point_isect
 
 from .defuzz import Defuzzer
 from .euclid import Point, Segment
+from .postulates import snap
 
 
 class IntersectionFailure(Exception):
     pass
 
 
-def segment_intersections(segments):
-    """Returns a dict mapping points to lists of segments."""
-    defuzz = Defuzzer().defuzz
-    for s in segments:
-        defuzz(s[0])
-        defuzz(s[1])
-
-    # poly_point_isect can fail with AssertionErrors.  Rotating all the
-    # segments avoids them, but different angles work for different sets of
-    # segments.  Try a few until we succeed.  This is super-lame...
+def segment_intersections(segments, grid=None):
+    """Returns a dict mapping points to lists of segments.
+
+    The segments are rotated and back again, so their endpoints have to be
+    restored: if their points are snapped to `grid`, by snapping again, or
+    otherwise by defuzzing.
+
+    """
+    if grid:
+        def defuzz(pt):
+            return (snap(pt[0], grid), snap(pt[1], grid))
+    else:
+        defuzz = Defuzzer().defuzz
+        for s in segments:
+            defuzz(s[0])
+            defuzz(s[1])
+
+    # poly_point_isect can fail with AssertionErrors: its sweep line does its
+    # own floating-point arithmetic, which the robust predicates in euclid
+    # can't reach.  Rotating all the segments avoids them, but different
+    # angles work for different sets of segments.  The segments are tried as
+    # they are first, which nearly always works, and only rotated if needed.
     for angle in [x/6 for x in range(0, 6*10)]:
-        rot = affine.Affine.rotation(angle)
-        rotsegs = [(rot * s[0], rot * s[1]) for s in segments]
+        if angle:
+            rot = affine.Affine.rotation(angle)
+            rotsegs = [(rot * s[0], rot * s[1]) for s in segments]
+        else:
+            rotsegs = segments
         try:
             pt_segments = poly_point_isect.isect_segments_include_segments(rotsegs)
         except AssertionError:
             continue
 
-        rot = affine.Affine.rotation(-angle)
         intersections = {}
-        for pt, segs in pt_segments:
-            rotsegs = [Segment(defuzz(rot * s[0]), defuzz(rot * s[1])) for s in segs]
-            intersections[Point(*(rot * pt))] = rotsegs
+        if angle:
+            rot = affine.Affine.rotation(-angle)
+            for pt, segs in pt_segments:
+                rotsegs = [Segment(defuzz(rot * s[0]), defuzz(rot * s[1])) for s in segs]
+                intersections[Point(*(rot * pt))] = rotsegs
+        else:
+            for pt, segs in pt_segments:
+                intersections[Point(*pt)] = [Segment(defuzz(s[0]), defuzz(s[1])) for s in segs]
 
         return intersections
 
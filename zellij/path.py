@@ -1,15 +1,37 @@
 """A zigzag path, a sequence of points."""
 
 import collections
+import math
 
 from .defuzz import Defuzzer
-from .euclid import collinear, Point, Line, Segment, Bounds, EmptyBounds
-from .postulates import adjacent_pairs, triples
+from .euclid import (
+    collinear, Point, Segment, Bounds, EmptyBounds,
+    CoincidentLines, COINCIDENT, INTERSECTING,
+)
+from .postulates import adjacent_pairs, least_rotation, triples
 
 
 class Path:
+    """An immutable sequence of points.
+
+    Paths never change once made, so the derived values (bounds, length,
+    segments, hash, canonical form) are computed on first use and kept.
+
+    """
+
+    __slots__ = (
+        'points', '_closed', '_hash', '_length', '_bounds', '_segments', '_canonical', '_miters',
+    )
+
     def __init__(self, points):
         self.points = tuple(points)
+        self._closed = None
+        self._hash = None
+        self._length = None
+        self._bounds = None
+        self._segments = None
+        self._canonical = None
+        self._miters = None
 
     def __repr__(self):
         return f"<Path {list(self.points)}>"
@@ -18,7 +40,9 @@ class Path:
         return self.points == other.points
 
     def __hash__(self):
-        return hash(self.points)
+        if self._hash is None:
+            self._hash = hash(self.points)
+        return self._hash
 
     def __lt__(self, other):
         return self.points < other.points
@@ -35,14 +59,24 @@ class Path:
         assert idx in [0, -1]
         return self.points[idx]
 
+    def __getstate__(self):
+        return self.points
+
+    def __setstate__(self, points):
+        self.__init__(points)
+
     @property
     def closed(self):
         """Does the path loop? Start and end are the same points."""
-        return self.points[0] == self.points[-1]
+        if self._closed is None:
+            self._closed = (self.points[0] == self.points[-1])
+        return self._closed
 
     def length(self):
         """The euclidean distance along the path."""
-        return sum(p1.distance(p2) for p1, p2 in adjacent_pairs(self.points))
+        if self._length is None:
+            self._length = sum(p1.distance(p2) for p1, p2 in adjacent_pairs(self.points))
+        return self._length
 
     def ends(self):
         yield self.points[0]
@@ -50,11 +84,17 @@ class Path:
 
     def bounds(self):
         """What is the `Bounds` for this path?"""
-        return Bounds.points(self.points)
+        if self._bounds is None:
+            self._bounds = Bounds.points(self.points)
+        return self._bounds
 
     def segments(self):
-        for p1, p2 in adjacent_pairs(self.points):
-            yield Segment(tuple(p1), tuple(p2))
+        """The tuple of Segments between consecutive points."""
+        if self._segments is None:
+            self._segments = tuple(
+                Segment(tuple(p1), tuple(p2)) for p1, p2 in adjacent_pairs(self.points)
+            )
+        return self._segments
 
     def transform(self, xform):
         """Transform the Path through the affine `xform`."""
@@ -88,11 +128,43 @@ class Path:
     def reversed(self):
         return Path(self.points[::-1])
 
+    def simplify(self, tolerance):
+        """Remove points that make less than `tolerance` of difference.
+
+        This is Ramer-Douglas-Peucker simplification: no point of the original
+        path is more than `tolerance` from the simplified path.  Loops are
+        split at the point farthest from their start, and each half is
+        simplified separately.
+
+        """
+        points = self.points
+        if len(points) <= 2 or tolerance <= 0:
+            return self
+
+        if self.closed:
+            start = points[0]
+            far = max(range(1, len(points) - 1), key=lambda i: start.distance(points[i]))
+            new_points = rdp(points[:far + 1], tolerance)[:-1] + rdp(points[far:], tolerance)
+            if len(new_points) < 4:
+                # Don't collapse a loop into a line.
+                return self
+        else:
+            new_points = rdp(points, tolerance)
+
+        if len(new_points) == len(points):
+            return self
+        return Path(new_points)
+
     def draw(self, ctx, append=False, reverse=False):
         points = self.points
         if reverse:
             points = points[::-1]
 
+        if hasattr(ctx, "polyline"):
+            # A Drawing can take all the points at once.
+            ctx.polyline(points[:-1] if self.closed else points, append=append, close=self.closed)
+            return
+
         (ctx.line_to if append else ctx.move_to)(*points[0])
 
         for pt in points[1:-1]:
@@ -103,27 +175,49 @@ class Path:
         else:
             ctx.line_to(*points[-1])
 
-    def offset_path(self, offset):
-        lines = []
-        for p1, p2 in adjacent_pairs(self.points):
-            lines.append(Line(p1, p2).offset(offset))
-
-        points = []
-        if self.closed:
-            p0 = lines[-1].intersect(lines[0])
-            points.append(p0)
-        else:
-            points.append(lines[0].p1)
-
-        for l1, l2 in adjacent_pairs(lines):
-            points.append(l1.intersect(l2))
-
-        if self.closed:
-            points.append(p0)
-        else:
-            points.append(lines[-1].p2)
+    def miters(self):
+        """The miter vectors for offsetting this path.
+
+        Offsetting the path by `d` moves each point by `d` times its miter
+        vector, which reaches the corner where the neighboring offset
+        segments meet.  The vectors don't depend on `d`, so they are computed
+        once for all offsets.
+
+        """
+        if self._miters is None:
+            # The unit normal of each segment, to the right (as Line.offset).
+            normals = []
+            for (x1, y1), (x2, y2) in adjacent_pairs(self.points):
+                dx, dy = x2 - x1, y2 - y1
+                hyp = math.hypot(dx, dy)
+                normals.append((dy / hyp, -dx / hyp) if hyp else (0, 0))
+
+            if self.closed:
+                ins = normals[-1:] + normals
+                outs = normals + normals[:1]
+            else:
+                ins = normals[:1] + normals
+                outs = normals + normals[-1:]
+
+            miters = []
+            for (nx1, ny1), (nx2, ny2) in zip(ins, outs):
+                # The miter is (n1 + n2) / (1 + n1.n2).  Parallel segments
+                # need no special case.  If the path doubles back on itself,
+                # the miter is infinite, so use the incoming normal instead.
+                denom = 1 + nx1 * nx2 + ny1 * ny2
+                if denom < 1e-9:
+                    miters.append((nx1, ny1))
+                else:
+                    miters.append(((nx1 + nx2) / denom, (ny1 + ny2) / denom))
+            self._miters = miters
+        return self._miters
 
-        return Path(points)
+    def offset_path(self, offset):
+        """Make the Path parallel to this one, `offset` away (to the right)."""
+        return Path(
+            Point(x + mx * offset, y + my * offset)
+            for (x, y), (mx, my) in zip(self.points, self.miters())
+        )
 
     def defuzz(self, defuzz):
         return Path([Point(*defuzz(pt)) for pt in self.points])
@@ -188,21 +282,174 @@ class Path:
 
     def canonicalize(self):
         """Produce an equivalent canonical path."""
-        if self.closed:
-            points = list(self.points[:-1])
-            points = min((points[i:]+points[:i])[::s] for i in range(len(points)) for s in [1, -1])
-            points.append(points[0])
-            return Path(points)
-        else:
-            return Path(min(self.points, self.points[::-1]))
+        if self._canonical is None:
+            if self.closed:
+                # The least rotation of the loop, in either direction.
+                candidates = []
+                for points in [self.points[:-1], self.points[-2::-1]]:
+                    start = least_rotation(points)
+                    candidates.append(points[start:] + points[:start + 1])
+                canonical = Path(min(candidates))
+            else:
+                canonical = Path(min(self.points, self.points[::-1]))
+            if canonical == self:
+                canonical = self
+            canonical._canonical = canonical
+            self._canonical = canonical
+        return self._canonical
+
+
+class Dot(Path):
+    """A zero-length open path at `point`.
+
+    It isn't closed, so it's drawn as a move and a line to the same point,
+    which round or square line caps turn into a dot.
+
+    """
+    __slots__ = ()
+
+    def __init__(self, point):
+        super().__init__([point, point])
+        self._closed = False
+
+    def __setstate__(self, points):
+        self.__init__(points[0])
 
 
+def rdp(points, tolerance):
+    """Ramer-Douglas-Peucker simplification of a sequence of points.
+
+    The first and last points are always kept.  Returns a list of points.
+    """
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    spans = [(0, len(points) - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        seg = Segment(points[first], points[last])
+        dist, farthest = max((seg.distance(points[i]), i) for i in range(first + 1, last))
+        if dist > tolerance:
+            keep[farthest] = True
+            spans.append((first, farthest))
+            spans.append((farthest, last))
+    return [pt for pt, kept in zip(points, keep) if kept]
+
+def simplify_paths(paths, tolerance):
+    """Simplify all of the paths, with `Path.simplify`."""
+    return [path.simplify(tolerance) for path in paths]
+
+def offset_paths(paths, offset):
+    """Offset all of the paths, with `Path.offset_path`."""
+    return [path.offset_path(offset) for path in paths]
+
 def defuzz_paths(paths):
     defuzz = Defuzzer().defuzz
     return [path.defuzz(defuzz) for path in paths]
 
-def combine_paths(paths):
-    paths = defuzz_paths(paths)
+def merge_overlaps(paths, ndigits=6):
+    """Merge collinear segments that overlap each other.
+
+    Mirrored tiling can draw a segment twice, or draw two segments that
+    partly overlap along a mirror line.  Segments are grouped by their
+    infinite line, using a hash of its normalized equation, so this is close
+    to linear.  Overlapping segments on a line are replaced by one path
+    spanning them all, with a point at each of their ends so that the paths
+    they joined still meet it.  The paths they were in are split around them.
+    Paths with no overlaps are returned untouched.
+
+    `ndigits` is the closeness for lines and overlaps, as in Defuzzer.
+
+    """
+    defuzz = Defuzzer(ndigits=ndigits).defuzz
+    eps = 10 ** -ndigits
+
+    # Group the segments by line: (path index, segment index, tmin, tmax, pmin, pmax).
+    lines = collections.defaultdict(list)
+    for ipath, path in enumerate(paths):
+        for iseg, ((x1, y1), (x2, y2)) in enumerate(adjacent_pairs(path.points)):
+            dx, dy = x2 - x1, y2 - y1
+            length = math.hypot(dx, dy)
+            if length == 0:
+                continue
+            # The unit normal and distance from the origin, with the normal
+            # pointing one consistent way.
+            nx, ny = -dy / length, dx / length
+            if nx < -eps or (nx <= eps and ny < 0):
+                nx, ny = -nx, -ny
+            key = defuzz((nx, ny, nx * x1 + ny * y1))
+            # Position along the line.
+            t1 = ny * x1 - nx * y1
+            t2 = ny * x2 - nx * y2
+            pmin, pmax = path.points[iseg], path.points[iseg + 1]
+            if t1 > t2:
+                t1, t2, pmin, pmax = t2, t1, pmax, pmin
+            lines[key].append((t1, t2, pmin, pmax, ipath, iseg))
+
+    merged = []
+    removed = collections.defaultdict(set)      # path index -> segment indexes
+    for segs in lines.values():
+        if len(segs) < 2:
+            continue
+        segs.sort(key=lambda seg: seg[0])
+        cluster = [segs[0]]
+        tmax = segs[0][1]
+        for seg in segs[1:] + [None]:
+            if seg is not None and seg[0] < tmax - eps:
+                # Overlaps the cluster.
+                cluster.append(seg)
+                tmax = max(tmax, seg[1])
+                continue
+            if len(cluster) > 1:
+                ends = sorted(
+                    [(t1, p1) for t1, _, p1, _, _, _ in cluster] +
+                    [(t2, p2) for _, t2, _, p2, _, _ in cluster],
+                    key=lambda end: end[0],
+                )
+                span = [ends[0]]
+                for end in ends[1:]:
+                    if end[0] > span[-1][0] + eps:
+                        span.append(end)
+                merged.append(Path([pt for _, pt in span]))
+                for _, _, _, _, ipath, iseg in cluster:
+                    removed[ipath].add(iseg)
+            if seg is not None:
+                cluster = [seg]
+                tmax = seg[1]
+
+    if not merged:
+        return list(paths)
+
+    result = []
+    for ipath, path in enumerate(paths):
+        if ipath not in removed:
+            result.append(path)
+            continue
+        piece = [path.points[0]]
+        for iseg, pt in enumerate(path.points[1:]):
+            if iseg in removed[ipath]:
+                if len(piece) > 1:
+                    result.append(Path(piece))
+                piece = [pt]
+            else:
+                piece.append(pt)
+        if len(piece) > 1:
+            result.append(Path(piece))
+    result.extend(merged)
+    return result
+
+def combine_paths(paths, defuzz=True):
+    """Join paths that share endpoints into longer paths.
+
+    Endpoints are matched exactly.  If `defuzz` is true, the points are
+    defuzzed first so that nearly-equal endpoints match.  Snapping to a grid
+    isn't a substitute: two values either side of a half-grid point snap to
+    different grid points, however close they are.
+
+    """
+    if defuzz:
+        paths = defuzz_paths(paths)
     pm = collections.defaultdict(list)
     for path in paths:
         for end in path.ends():
@@ -276,9 +523,130 @@ def paths_bounds(paths):
         bounds |= path.bounds()
     return bounds
 
-def clip_paths(paths, bounds):
-    """Return the paths that overlap the bounds."""
-    return [path for path in paths if path.bounds().overlap(bounds)]
+def clip_paths(paths, clip, margin=0):
+    """Cut the paths down to the parts inside `clip`.
+
+    `clip` is a Bounds, or a convex polygon Path, like `Drawing.perimeter()`.
+    It is grown outward by `margin` first.  Paths entirely inside are kept,
+    paths entirely outside are dropped, and the rest are cut where they cross
+    the edge, possibly into a number of pieces.
+
+    """
+    if isinstance(clip, Bounds):
+        clip = Path(clip.corners())
+    if not clip.closed:
+        clip = Path(clip.points + clip.points[:1])
+    if signed_area(clip) < 0:
+        clip = clip.reversed()
+    if margin:
+        clip = clip.offset_path(margin)
+
+    # The clip polygon as half-planes: a point is inside if nx*x + ny*y <= c
+    # for all of them.
+    planes = []
+    for (x1, y1), (x2, y2) in adjacent_pairs(clip.points):
+        nx, ny = y2 - y1, x1 - x2
+        planes.append((nx, ny, nx * x1 + ny * y1))
+    clip_bounds = clip.bounds()
+
+    def inside(pt):
+        x, y = pt
+        return all(nx * x + ny * y <= c for nx, ny, c in planes)
+
+    clipped = []
+    for path in paths:
+        bounds = path.bounds()
+        if not bounds.overlap(clip_bounds):
+            continue
+        if all(inside(pt) for pt in bounds.corners()):
+            clipped.append(path)
+        else:
+            clipped.extend(clip_path(path, planes))
+    return clipped
+
+def clip_path(path, planes):
+    """Cut `path` to the convex region defined by `planes`.
+
+    This is Cyrus-Beck clipping (Liang-Barsky generalized to convex polygons)
+    of each segment.  Returns a list of Paths.
+
+    """
+    pieces = []
+    piece = None
+    cut = False
+    for p, q in adjacent_pairs(path.points):
+        (px, py), (qx, qy) = p, q
+        dx, dy = qx - px, qy - py
+        t0, t1 = 0.0, 1.0
+        for nx, ny, c in planes:
+            num = c - (nx * px + ny * py)
+            den = nx * dx + ny * dy
+            if den == 0:
+                if num < 0:
+                    t0 = t1
+            elif den > 0:
+                # Heading out of this half-plane.
+                t1 = min(t1, num / den)
+            else:
+                t0 = max(t0, num / den)
+            if t0 >= t1:
+                break
+
+        if t0 > 0 or t1 < 1:
+            cut = True
+
+        if t0 >= t1:
+            # This segment is entirely outside.
+            if piece:
+                pieces.append(piece)
+                piece = None
+            continue
+
+        if t0 > 0:
+            if piece:
+                pieces.append(piece)
+            piece = [Point(px + t0 * dx, py + t0 * dy)]
+        elif piece is None:
+            piece = [p]
+
+        if t1 < 1:
+            piece.append(Point(px + t1 * dx, py + t1 * dy))
+            pieces.append(piece)
+            piece = None
+        else:
+            piece.append(q)
+
+    if piece:
+        pieces.append(piece)
+
+    if not cut:
+        return [path]
+
+    if path.closed and len(pieces) > 1 and pieces[0][0] == path.points[0] and pieces[-1][-1] == path.points[-1]:
+        # The first and last pieces meet at the start of the loop.
+        pieces[0] = pieces.pop() + pieces[0][1:]
+
+    return [Path(piece) for piece in pieces]
+
+def signed_area(path):
+    """The area inside a closed path: positive if it's counter-clockwise (y up)."""
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in adjacent_pairs(path.points)) / 2
+
+def dedupe_paths(paths):
+    """Remove duplicate paths.
+
+    Paths are duplicates if they have the same points in either direction,
+    or, for loops, starting anywhere.  The first of each is kept.
+
+    """
+    seen = set()
+    unique = []
+    for path in paths:
+        canonical = path.canonicalize()
+        if canonical not in seen:
+            seen.add(canonical)
+            unique.append(path)
+    return unique
 
 def equal_path(path1, path2):
     return path1.canonicalize() == path2.canonicalize()
@@ -299,9 +667,11 @@ def paths_length(paths):
 def seg_path_intersections(segment, path):
     """Return a list of all the points where segment and path intersect."""
     for pseg in path.segments():
-        pt = segment.intersect(pseg)
-        if pt is not None:
+        status, pt = segment.intersect_status(pseg)
+        if status == INTERSECTING:
             yield pt
+        elif status == COINCIDENT:
+            raise CoincidentLines("Segments overlap", segment, pseg)
 
 def perturb_paths(paths, jitter):
     """Perturb all of the points in all of the path."""
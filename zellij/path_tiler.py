@@ -7,16 +7,24 @@ from affine import Affine
 
 from .euclid import Point
 from .path import Path
-from .postulates import isclose
+from .postulates import isclose, snap
 
 
 class PathCanvas:
-    """A drawable surface that produces paths as a result."""
-    def __init__(self):
+    """A drawable surface that produces paths as a result.
+
+    If `grid` is provided, every point is snapped to a multiple of it.  Nearly
+    all points that should be the same then have exactly the same
+    coordinates.  Points either side of a half-grid point don't, so the paths
+    still need defuzzing.
+
+    """
+    def __init__(self, grid=None):
         self.path_pts = []
         self.transform = Affine.identity()
         self.curpt = None
         self.saved_state = []
+        self.grid = grid
 
     # Path creation.
 
@@ -24,16 +32,22 @@ class PathCanvas:
     def paths(self):
         return [Path(pts) for pts in self.path_pts]
 
-    def move_to(self, x, y):
+    def _device_point(self, x, y):
         x, y = self.transform * (x, y)
+        if self.grid:
+            x, y = snap(x, self.grid), snap(y, self.grid)
+        return Point(x, y)
+
+    def move_to(self, x, y):
+        pt = self._device_point(x, y)
         self.path_pts.append([])
-        self.path_pts[-1].append(Point(x, y))
-        self.curpt = x, y
+        self.path_pts[-1].append(pt)
+        self.curpt = pt
 
     def line_to(self, x, y):
-        x, y = self.transform * (x, y)
-        self.path_pts[-1].append(Point(x, y))
-        self.curpt = x, y
+        pt = self._device_point(x, y)
+        self.path_pts[-1].append(pt)
+        self.curpt = pt
 
     def rel_line_to(self, dx, dy):
         x, y = ~self.transform * self.curpt
@@ -132,17 +146,71 @@ def square_to_parallelogram(pt1, pt2):
     return xform2 * xform1 * scale
 
 
+def rectangular_period(vcol, vrow, max_rows=6):
+    """Find an axis-aligned rectangle that repeats in a lattice.
+
+    The lattice is generated by `vcol` and `vrow`.  `vcol` must be horizontal,
+    and up to `max_rows` multiples of `vrow` are tried to find one that is a
+    whole number of `vcol` steps from vertical.
+
+    Returns (width, height), or None if there's no such rectangle.
+
+    """
+    (x1, y1), (x2, y2) = vcol, vrow
+    if not isclose(y1, 0):
+        return None
+    for rows in range(1, max_rows + 1):
+        cols = rows * x2 / x1
+        if isclose(cols, round(cols)):
+            return abs(x1), abs(rows * y2)
+    return None
+
+
 class PathTiler:
-    """Apply kaleidoscopic symmetries to drawing functions."""
+    """Apply kaleidoscopic symmetries to drawing functions.
 
-    def __init__(self, drawing):
+    `grid` is passed to the PathCanvas to snap the tiled points.
+
+    After tiling, `period` is the (width, height) of a rectangle that repeats
+    across the drawing, or None if it's unknown.
+
+    Tiling also records how the drawing is built from copies, for output
+    formats that can reuse shapes: `unit_paths` are the paths of the draw
+    function on its own, `orbit` is the list of Affines placing the unit in
+    one lattice cell, and `cells` is the list of Affines placing each cell.
+    If `instances_only` is true, only the first cell is drawn into `paths`.
+
+    """
+
+    def __init__(self, drawing, grid=None, instances_only=False):
         self.drawing = drawing
-        self.pc = PathCanvas()
+        self.pc = PathCanvas(grid=grid)
+        self.instances_only = instances_only
+        self.period = None
+        self.unit_paths = None
+        self.orbit = []
+        self.cells = []
 
     @property
     def paths(self):
         return self.pc.paths
 
+    def _recorded(self, draw_func):
+        """Wrap the design's `draw_func` to record where its copies go."""
+        if self.unit_paths is not None:
+            # An outer tile_* method is already recording.
+            return draw_func
+
+        pc = PathCanvas()
+        draw_func(pc)
+        self.unit_paths = pc.paths
+
+        def recorded_draw_func(pc):
+            if len(self.cells) == 1:
+                self.orbit.append(~self.cells[0] * pc.transform)
+            draw_func(pc)
+        return recorded_draw_func
+
     # Tiling of draw functions.
     # http://www.quadibloc.com/math/images/wall17.gif
     # https://www.math.toronto.edu/drorbn/Gallery/Symmetry/Tilings/Sanderson/index.html
@@ -159,12 +227,19 @@ class PathTiler:
 
     def tile_p1(self, draw_func, vcol, vrow):
         """Repeatedly call draw_func to tile the drawing."""
+        self.period = rectangular_period(vcol, vrow)
+        draw_func = self._recorded(draw_func)
         for x, y in self.p1_points(vcol, vrow):
             with self.pc.saved():
                 self.pc.translate(x, y)
+                self.cells.append(self.pc.transform)
+                if self.instances_only and len(self.cells) > 1:
+                    continue
                 draw_func(self.pc)
 
     def tile_pmm(self, draw_func, dx, dy):
+        draw_func = self._recorded(draw_func)
+
         def four_mirror(pc):
             draw_func(pc)
             with pc.saved():
@@ -180,6 +255,8 @@ class PathTiler:
         self.tile_p1(four_mirror, (dx*2, 0), (0, dy*2))
 
     def tile_p6(self, draw_func, triw):
+        draw_func = self._recorded(draw_func)
+
         def six_triangles(pc):
             pc.translate(0, triw)
             for _ in range(6):
@@ -190,6 +267,8 @@ class PathTiler:
         self.tile_p1(six_triangles, (triw3, 0), (triw3 / 2, 1.5 * triw))
 
     def tile_p6m(self, draw_func, triw):
+        draw_func = self._recorded(draw_func)
+
         def draw_mirrored(pc):
             draw_func(pc)
             with pc.saved():
@@ -0,0 +1,314 @@
+"""
+Writing PNG files a piece at a time, without Cairo.
+"""
+
+import collections
+import itertools
+import re
+import struct
+import sys
+import zlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PIXEL_RUN = re.compile(rb"(....)\1*", re.DOTALL)
+ADLER_BASE = 65521
+
+# Names for the PNG row filter types we can write, and for zlib strategies.
+PNG_FILTERS = {'none': 0, 'sub': 1, 'up': 2}
+ZLIB_STRATEGIES = {
+    'default': zlib.Z_DEFAULT_STRATEGY,
+    'filtered': zlib.Z_FILTERED,
+    'huffman': zlib.Z_HUFFMAN_ONLY,
+    'rle': zlib.Z_RLE,
+    'fixed': zlib.Z_FIXED,
+}
+
+
+def png_chunk(kind, data):
+    """Make a PNG chunk of type `kind` (four bytes) holding `data`."""
+    return (
+        struct.pack(">I", len(data)) + kind + data +
+        struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def adler32_combine(adler1, adler2, len2):
+    """The Adler-32 of two byte strings joined, from their separate checksums.
+
+    `adler1` and `adler2` are the checksums of the two strings, and `len2` is
+    the length of the second one.  This is zlib's adler32_combine.
+
+    """
+    rem = len2 % ADLER_BASE
+    sum1 = adler1 & 0xffff
+    sum2 = (rem * sum1) % ADLER_BASE
+    sum1 += (adler2 & 0xffff) + ADLER_BASE - 1
+    sum2 += (adler1 >> 16) + (adler2 >> 16) + ADLER_BASE - rem
+    sum1 %= ADLER_BASE
+    sum2 %= ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+
+def argb32_to_rgb(data, width, height, stride):
+    """Convert opaque Cairo ARGB32 pixels to packed RGB bytes.
+
+    Cairo stores each pixel as a native-endian 32-bit word.  Opaque pixels
+    aren't changed by premultiplying, so the alpha is simply dropped.
+
+    """
+    data = bytes(data)
+    if stride != width * 4:
+        data = b"".join(data[y * stride:y * stride + width * 4] for y in range(height))
+    if sys.byteorder == "little":
+        r, g, b = 2, 1, 0
+    else:
+        r, g, b = 1, 2, 3
+    rgb = bytearray(width * height * 3)
+    rgb[0::3] = data[r::4]
+    rgb[1::3] = data[g::4]
+    rgb[2::3] = data[b::4]
+    return rgb
+
+
+def argb32_to_rgba(data, width, height, stride):
+    """Convert Cairo ARGB32 pixels to packed, straight (not premultiplied) RGBA.
+
+    Only the pixels that aren't opaque need to be unpremultiplied, and most
+    drawings have few of them.
+
+    """
+    data = bytes(data)
+    if stride != width * 4:
+        data = b"".join(data[y * stride:y * stride + width * 4] for y in range(height))
+    if sys.byteorder == "little":
+        r, g, b, a = 2, 1, 0, 3
+    else:
+        r, g, b, a = 1, 2, 3, 0
+    rgba = bytearray(len(data))
+    rgba[0::4] = data[r::4]
+    rgba[1::4] = data[g::4]
+    rgba[2::4] = data[b::4]
+    alpha = data[a::4]
+    rgba[3::4] = alpha
+    for match in re.finditer(b"[^\xff]", alpha):
+        i = match.start() * 4
+        opacity = rgba[i + 3]
+        if opacity:
+            for c in range(i, i + 3):
+                rgba[c] = min(255, (rgba[c] * 255 + opacity // 2) // opacity)
+    return rgba
+
+
+def argb32_runs(data, width, height, stride):
+    """Split Cairo ARGB32 data into runs of the same pixel.
+
+    Produces (word, count) pairs, row after row.  Drawings in flat colors
+    have long runs, so this is much faster than looking at every pixel.
+
+    """
+    data = bytes(data)
+    if stride != width * 4:
+        data = b"".join(data[y * stride:y * stride + width * 4] for y in range(height))
+    for match in PIXEL_RUN.finditer(data):
+        yield int.from_bytes(match[1], sys.byteorder), (match.end() - match.start()) // 4
+
+
+def word_channels(word):
+    """The premultiplied (a, r, g, b) channels of an ARGB32 word."""
+    return (word >> 24, (word >> 16) & 0xff, (word >> 8) & 0xff, word & 0xff)
+
+
+def unpremultiply(color):
+    """Convert premultiplied (a, r, g, b) channels to straight (r, g, b, a)."""
+    a, r, g, b = color
+    if a == 0:
+        return (0, 0, 0, 0)
+    if a == 255:
+        return (r, g, b, a)
+    return tuple(min(255, (c * 255 + a // 2) // a) for c in (r, g, b)) + (a,)
+
+
+def quantize_argb32(counts, colors=256, flat=8):
+    """Choose a palette for ARGB32 pixels, and the palette entry for each.
+
+    `counts` maps words to how many pixels have them.  If there are no more
+    than `colors` of them, each gets its own entry.  Otherwise up to `flat`
+    of the most common are taken as the flat colors of the drawing, with
+    blends between each pair of them for the antialiased edges where they
+    meet, and the rest of the palette is the next most common colors.  Each
+    word is mapped to the nearest entry.
+
+    Returns (palette, index): a list of premultiplied (a, r, g, b) colors,
+    and a dict mapping each word to its palette index.
+
+    """
+    common = sorted(counts, key=counts.get, reverse=True)
+    if len(common) <= colors:
+        return [word_channels(w) for w in common], {w: i for i, w in enumerate(common)}
+
+    # As many flat colors as leave room for a few blends between each pair.
+    nflat = min(flat, colors)
+    while nflat > 2 and (colors - nflat) // (nflat * (nflat - 1) // 2) < 3:
+        nflat -= 1
+    pairs = list(itertools.combinations(range(nflat), 2))
+    steps = min((colors - nflat) // len(pairs), 15) if pairs else 0
+
+    palette = [word_channels(w) for w in common[:nflat]]
+    # For each pair, the palette index of each step from one to the other.
+    blends = {}
+    for i, j in pairs:
+        blends[i, j] = [i]
+        for k in range(1, steps + 1):
+            t = k / (steps + 1)
+            blends[i, j].append(len(palette))
+            palette.append(tuple(
+                round(c1 + (c2 - c1) * t) for c1, c2 in zip(palette[i], palette[j])
+            ))
+        blends[i, j].append(j)
+    start = len(palette)
+    palette.extend(word_channels(w) for w in common[nflat:nflat + colors - start])
+    others = range(start, len(palette))
+
+    index = {word: i for i, word in enumerate(common[:nflat])}
+    for word in common[nflat:]:
+        color = word_channels(word)
+        best, best_dist = 0, float("inf")
+        for n in others:
+            dist = sum((c - p) ** 2 for c, p in zip(color, palette[n]))
+            if dist < best_dist:
+                best, best_dist = n, dist
+        # Antialiased pixels are on the line between two flat colors: find
+        # the nearest step along each line.
+        for (i, j), steps_ij in blends.items():
+            c1, c2 = palette[i], palette[j]
+            delta = [b - a for a, b in zip(c1, c2)]
+            length2 = sum(d * d for d in delta)
+            t = sum((c - a) * d for c, a, d in zip(color, c1, delta)) / length2
+            n = steps_ij[min(max(round(t * (len(steps_ij) - 1)), 0), len(steps_ij) - 1)]
+            dist = sum((c - p) ** 2 for c, p in zip(color, palette[n]))
+            if dist < best_dist:
+                best, best_dist = n, dist
+        index[word] = best
+    return palette, index
+
+
+def write_indexed_png(
+    f, data, width, height, stride, colors=256, level=9, strategy=zlib.Z_DEFAULT_STRATEGY,
+    filter_type=0,
+):
+    """Write Cairo ARGB32 data as an 8-bit indexed-color PNG to the binary file `f`.
+
+    The palette has at most `colors` entries, chosen by `quantize_argb32`.
+    `level` and `strategy` are for zlib: Z_RLE is much faster, and nearly
+    as small for flat colors.  `filter_type` is for `filtered_rows`.  No
+    filtering is usually best for palette images.
+
+    """
+    runs = list(argb32_runs(data, width, height, stride))
+    counts = collections.Counter()
+    for word, count in runs:
+        counts[word] += count
+    palette, index = quantize_argb32(counts, colors)
+    straight = [unpremultiply(color) for color in palette]
+
+    f.write(PNG_SIGNATURE)
+    f.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)))
+    f.write(png_chunk(b"PLTE", bytes(c for r, g, b, _ in straight for c in (r, g, b))))
+    if any(a != 255 for *_, a in straight):
+        f.write(png_chunk(b"tRNS", bytes(a for *_, a in straight)))
+    index_bytes = {word: bytes((i,)) for word, i in index.items()}
+    pixels = b"".join(index_bytes[word] * count for word, count in runs)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+    deflated = compressor.compress(filtered_rows(pixels, width, filter_type)) + compressor.flush()
+    f.write(png_chunk(b"IDAT", deflated))
+    f.write(png_chunk(b"IEND", b""))
+
+
+def filtered_rows(pixels, row_bytes, filter_type=0, bpp=1):
+    """Filter each row of `pixels` for PNG, prefixed with its filter type.
+
+    `filter_type` is 0 for no filtering, 1 (sub) for the difference from the
+    byte `bpp` bytes to the left, or 2 (up) for the difference from the byte
+    above.
+
+    """
+    if filter_type == 0:
+        return b"".join(
+            b"\0" + pixels[start:start + row_bytes]
+            for start in range(0, len(pixels), row_bytes)
+        )
+    if filter_type not in (1, 2):
+        raise ValueError(f"Can't write PNG filter type {filter_type}")
+    rows = []
+    above = bytes(row_bytes)
+    for start in range(0, len(pixels), row_bytes):
+        row = bytes(pixels[start:start + row_bytes])
+        if filter_type == 1:
+            rows.append(b"\1" + byte_differences(row, bytes(bpp) + row[:-bpp]))
+        else:
+            rows.append(b"\2" + byte_differences(row, above))
+        above = row
+    return b"".join(rows)
+
+
+def byte_differences(a, b):
+    """Each byte of `a` minus the byte of `b` under it, modulo 256.
+
+    The bytes are treated as one big integer, with the high bit of each byte
+    set on one side and cleared on the other so that no byte borrows from its
+    neighbor.
+
+    """
+    high = int.from_bytes(b"\x80" * len(a), "big")
+    x = int.from_bytes(a, "big")
+    y = int.from_bytes(b, "big")
+    diff = ((x | high) - (y & ~high)) ^ ((x ^ y ^ high) & high)
+    return diff.to_bytes(len(a), "big")
+
+
+def compress_band(rows, last, level=6):
+    """Compress one band of filtered rows for a banded PNG.
+
+    Returns (deflated, adler, length).  Bands are compressed separately as
+    raw deflate data, flushed to a byte boundary, so they can simply be
+    joined.  Only the `last` band finishes the stream.
+
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    deflated = compressor.compress(rows)
+    deflated += compressor.flush(zlib.Z_FINISH if last else zlib.Z_FULL_FLUSH)
+    return deflated, zlib.adler32(rows), len(rows)
+
+
+class BandedPngWriter:
+    """Write an RGB PNG file, one band of rows at a time.
+
+    Each band is the result of `compress_band`, and they must be written in
+    order.  Only one band needs to be in memory at a time.
+
+    """
+    def __init__(self, f, width, height):
+        self.f = f
+        self.adler = 1
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+        f.write(PNG_SIGNATURE)
+        f.write(png_chunk(b"IHDR", ihdr))
+        # The zlib header: deflate, 32K window, default compression.
+        f.write(png_chunk(b"IDAT", b"\x78\x9c"))
+
+    def write_band(self, band):
+        deflated, adler, length = band
+        self.adler = adler32_combine(self.adler, adler, length)
+        self.f.write(png_chunk(b"IDAT", deflated))
+
+    def finish(self):
+        self.f.write(png_chunk(b"IDAT", struct.pack(">I", self.adler)))
+        self.f.write(png_chunk(b"IEND", b""))
+
+
+def write_solid_png(f, width, height, rgb):
+    """Write an RGB PNG of one solid color to the binary file `f`."""
+    pixel = bytes(round(c * 255) for c in rgb)
+    writer = BandedPngWriter(f, width, height)
+    writer.write_band(compress_band(filtered_rows(pixel * (width * height), width * 3), last=True))
+    writer.finish()
@@ -28,6 +28,33 @@ def triples(seq):
     return zip(seq, seq[1:], seq[2:])
 
 
+def least_rotation(seq):
+    """Find the start of the lexicographically least rotation of `seq`.
+
+    Uses Booth's algorithm, which is linear in the length of `seq`.  Returns
+    the index that the least rotation starts at.
+    """
+    # https://en.wikipedia.org/wiki/Lexicographically_minimal_string_rotation
+    s = seq + seq
+    failure = [-1] * len(s)
+    k = 0
+    for j in range(1, len(s)):
+        sj = s[j]
+        i = failure[j - k - 1]
+        while i != -1 and sj != s[k + i + 1]:
+            if sj < s[k + i + 1]:
+                k = j - i - 1
+            i = failure[i]
+        if sj != s[k + i + 1]:
+            # i is -1 here.
+            if sj < s[k]:
+                k = j
+            failure[j - k] = -1
+        else:
+            failure[j - k] = i + 1
+    return k
+
+
 def overlap(start1, end1, start2, end2):
     """Does the range (start1, end1) overlap with (start2, end2)?"""
     # https://nedbatchelder.com/blog/201310/range_overlap_in_two_compares.html
@@ -46,6 +73,11 @@ def fbetween(a, b, c):
         return isclose(a, b) or isclose(b, c)
 
 
+def snap(v, grid):
+    """Round `v` to the nearest multiple of `grid`."""
+    return round(v / grid) * grid
+
+
 def perturbed(v, jitter):
     """Return `v`, with -jitter..jitter randomly added."""
     return v + 2*jitter * random.random() - jitter
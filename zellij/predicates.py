@@ -0,0 +1,105 @@
+"""
+Robust geometric predicates.
+
+These give the exact sign of the orientation and incircle determinants for
+float inputs.  Each is computed first in floating point, along with a bound
+on its rounding error (from Shewchuk, "Adaptive Precision Floating-Point
+Arithmetic and Fast Robust Geometric Predicates").  If the result is larger
+than the bound, its sign is right, which is nearly always the case.  If not,
+the determinant is recomputed exactly with Fractions.
+
+Because the answers are exact, they don't depend on the scale of the
+coordinates.
+
+"""
+
+from fractions import Fraction
+import sys
+
+EPSILON = sys.float_info.epsilon / 2
+ORIENT2D_ERRBOUND = (3 + 16 * EPSILON) * EPSILON
+INCIRCLE_ERRBOUND = (10 + 96 * EPSILON) * EPSILON
+
+
+def sign(v):
+    """-1, 0, or 1, according to the sign of `v`."""
+    return (v > 0) - (v < 0)
+
+
+def orient2d(a, b, c):
+    """Which way do three points turn?
+
+    Returns 1 if a, b, c are in counter-clockwise order (with y up), -1 if
+    they are clockwise, and 0 if they are exactly collinear.
+
+    """
+    (ax, ay), (bx, by), (cx, cy) = a, b, c
+    detleft = (ax - cx) * (by - cy)
+    detright = (ay - cy) * (bx - cx)
+    det = detleft - detright
+    errbound = ORIENT2D_ERRBOUND * (abs(detleft) + abs(detright))
+    if det > errbound or -det > errbound:
+        return sign(det)
+    return sign(orient2d_exact(a, b, c))
+
+
+def orient2d_exact(a, b, c):
+    """The orientation determinant of a, b, c, exactly, as a Fraction.
+
+    It's twice the signed area of the triangle.
+
+    """
+    (ax, ay), (bx, by), (cx, cy) = [(Fraction(x), Fraction(y)) for x, y in (a, b, c)]
+    return (ax - cx) * (by - cy) - (ay - cy) * (bx - cx)
+
+
+def incircle(a, b, c, d):
+    """Where is `d` compared to the circle through a, b, and c?
+
+    a, b, c must be in counter-clockwise order.  Returns 1 if d is inside the
+    circle, -1 if it is outside, and 0 if it is exactly on the circle.
+
+    """
+    (ax, ay), (bx, by), (cx, cy), (dx, dy) = a, b, c, d
+    adx, ady = ax - dx, ay - dy
+    bdx, bdy = bx - dx, by - dy
+    cdx, cdy = cx - dx, cy - dy
+
+    bdxcdy = bdx * cdy
+    cdxbdy = cdx * bdy
+    alift = adx * adx + ady * ady
+
+    cdxady = cdx * ady
+    adxcdy = adx * cdy
+    blift = bdx * bdx + bdy * bdy
+
+    adxbdy = adx * bdy
+    bdxady = bdx * ady
+    clift = cdx * cdx + cdy * cdy
+
+    det = (
+        alift * (bdxcdy - cdxbdy) +
+        blift * (cdxady - adxcdy) +
+        clift * (adxbdy - bdxady)
+    )
+    permanent = (
+        (abs(bdxcdy) + abs(cdxbdy)) * alift +
+        (abs(cdxady) + abs(adxcdy)) * blift +
+        (abs(adxbdy) + abs(bdxady)) * clift
+    )
+    errbound = INCIRCLE_ERRBOUND * permanent
+    if det > errbound or -det > errbound:
+        return sign(det)
+    return sign(_incircle_exact(a, b, c, d))
+
+
+def _incircle_exact(a, b, c, d):
+    (ax, ay), (bx, by), (cx, cy), (dx, dy) = [(Fraction(x), Fraction(y)) for x, y in (a, b, c, d)]
+    adx, ady = ax - dx, ay - dy
+    bdx, bdy = bx - dx, by - dy
+    cdx, cdy = cx - dx, cy - dy
+    return (
+        (adx * adx + ady * ady) * (bdx * cdy - cdx * bdy) +
+        (bdx * bdx + bdy * bdy) * (cdx * ady - adx * cdy) +
+        (cdx * cdx + cdy * cdy) * (adx * bdy - bdx * ady)
+    )
@@ -0,0 +1,115 @@
+"""
+Writing a drawing as a Deep Zoom tile pyramid, for zoomable viewers.
+"""
+
+import concurrent.futures
+import math
+import os
+import shutil
+
+from .drawing import Drawing, StandInDrawing
+from .euclid import Bounds
+from .png import write_solid_png
+from .svg import Matrix
+
+DZI_TEMPLATE = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="png" Overlap="0" TileSize="{tile_size}">
+  <Size Width="{width}" Height="{height}"/>
+</Image>
+"""
+
+
+class TilePyramid(StandInDrawing):
+    """A drawing written as a Deep Zoom (.dzi) tile pyramid.
+
+    This stands in for a Drawing while the geometry is computed.  Then
+    `render` records the drawing once, and renders every zoom level from
+    the recording: level N is the full size, and each level below it is
+    half as big, down to a single pixel.
+
+    At each level, lines are simplified to within `tolerance` pixels.  Only
+    tiles with something drawn on them are rendered, in `processes` worker
+    processes.  The empty tiles are all links to one background tile.
+
+    """
+    def __init__(
+        self, width, height, name=None, bg=(1, 1, 1), format=None, snap=False,
+        tile_size=256, tolerance=0.25, processes=None,
+    ):
+        super().__init__(width, height, name=name, format=format or 'dzi', snap=snap)
+        if self.format != 'dzi':
+            raise ValueError(f"A tile pyramid can't be {self.format}")
+        if not bg or len(bg) != 3:
+            raise ValueError("A tile pyramid needs an opaque background")
+        self.bg = bg
+        self.tile_size = tile_size
+        self.tolerance = tolerance
+        self.processes = processes
+        self.tiles_dir = os.path.splitext(self.name)[0] + "_files"
+
+    def levels(self):
+        """Produce (level, scale, width, height) for each zoom level, largest first."""
+        top = math.ceil(math.log2(max(self.width, self.height)))
+        for level in range(top, -1, -1):
+            scale = 2 ** (level - top)
+            yield level, scale, math.ceil(self.width * scale), math.ceil(self.height * scale)
+
+    def tiles(self, width, height):
+        """Produce (col, row, Bounds) for the tiles of a level."""
+        size = self.tile_size
+        for col in range(math.ceil(width / size)):
+            for row in range(math.ceil(height / size)):
+                x0, y0 = col * size, row * size
+                yield col, row, Bounds(x0, y0, min(x0 + size, width), min(y0 + size, height))
+
+    def render(self, draw_func, *args):
+        """Record `draw_func(dwg, *args)`, and write the pyramid."""
+        dwg = Drawing(self.width, self.height, name=self.name, backend='record', bg=None, snap=self.snap)
+        dwg.set_matrix(Matrix.from_affine(self.transform))
+        draw_func(dwg, *args)
+        recording = dwg.surface
+
+        os.makedirs(self.tiles_dir, exist_ok=True)
+        with open(self.name, "w") as f:
+            f.write(DZI_TEMPLATE.format(tile_size=self.tile_size, width=self.width, height=self.height))
+
+        empty_tiles = {}
+        with concurrent.futures.ProcessPoolExecutor(self.processes or os.cpu_count()) as executor:
+            for level, scale, width, height in self.levels():
+                level_dir = os.path.join(self.tiles_dir, str(level))
+                os.makedirs(level_dir, exist_ok=True)
+                tile_recs = recording.scaled(scale, self.tolerance).tiled(self.tile_size)
+                jobs = []
+                for col, row, bounds in self.tiles(width, height):
+                    tile_name = os.path.join(level_dir, f"{col}_{row}.png")
+                    tile_rec = tile_recs.get((col, row))
+                    if tile_rec is not None:
+                        jobs.append((tile_rec, bounds, self.bg, tile_name))
+                    else:
+                        self._empty_tile(tile_name, bounds, empty_tiles)
+                list(executor.map(_render_tile, jobs, chunksize=8))
+
+    def _empty_tile(self, tile_name, bounds, empty_tiles):
+        """Write an empty tile, as a link to the first of its size."""
+        if os.path.exists(tile_name):
+            os.remove(tile_name)
+        size = (int(bounds.width), int(bounds.height))
+        first = empty_tiles.get(size)
+        if first is None:
+            with open(tile_name, "wb") as f:
+                write_solid_png(f, *size, self.bg)
+            empty_tiles[size] = tile_name
+        else:
+            try:
+                os.link(first, tile_name)
+            except OSError:
+                shutil.copyfile(first, tile_name)
+
+
+def _render_tile(job):
+    """Render one tile of the pyramid in a worker."""
+    recording, bounds, bg, tile_name = job
+    dwg = Drawing(bounds=bounds, name=tile_name, format='png', bg=bg, snap=False)
+    dwg.replay(recording)
+    dwg.finish()
@@ -0,0 +1,186 @@
+"""
+Recording drawing operations, to replay them later in pieces.
+"""
+
+import collections
+import math
+
+from .euclid import Bounds, EmptyBounds, Point
+from .path import rdp
+from .svg import StrokeStyle
+
+# One stroke or fill.  `kind` is "stroke" or "fill", `style` is a
+# StrokeStyle or an (r, g, b, a) color, and `subpaths` is a list of
+# (bounds, ops) pairs: the device-space Bounds of each subpath, including
+# the width of the stroke, and its path operations.
+Shape = collections.namedtuple("Shape", "kind style subpaths")
+
+# How far a miter join can stick out, in line widths.  Cairo's default
+# miter limit is 10.
+MITER_REACH = 5
+
+
+def ops_bounds(ops):
+    """The Bounds of device-space path operations."""
+    bounds = EmptyBounds()
+    for op in ops:
+        if op[0] == "A":
+            _, xc, yc, radius = op[:4]
+            bounds |= Bounds(xc - radius, yc - radius, xc + radius, yc + radius)
+        elif op[0] != "Z":
+            bounds |= Bounds(op[1], op[2], op[1], op[2])
+    return bounds
+
+
+def split_subpaths(ops, pad):
+    """Split path operations at each move_to, into (bounds, ops) pairs.
+
+    The bounds are made larger by `pad` all around.
+
+    """
+    subpaths = []
+    for op in ops:
+        if op[0] == "M" or not subpaths:
+            subpaths.append([])
+        subpaths[-1].append(op)
+    result = []
+    for sub in subpaths:
+        llx, lly, urx, ury = ops_bounds(sub)
+        result.append((Bounds(llx - pad, lly - pad, urx + pad, ury + pad), sub))
+    return result
+
+
+def scale_ops(ops, scale, tolerance):
+    """Scale device-space path operations, simplifying runs of lines.
+
+    Lines are simplified with Ramer-Douglas-Peucker to within `tolerance`
+    of the scaled device space.
+
+    """
+    scaled = []
+    run = []
+    run_kind = []
+
+    def end_run():
+        if run:
+            points = rdp(run, tolerance) if tolerance and len(run) > 2 else run
+            scaled.append((run_kind[0], *points[0]))
+            scaled.extend(("L", *pt) for pt in points[1:])
+            run.clear()
+            run_kind.clear()
+
+    for op in ops:
+        kind = op[0]
+        if kind == "M":
+            end_run()
+        if kind in "ML":
+            if not run:
+                run_kind.append(kind)
+            run.append(Point(op[1] * scale, op[2] * scale))
+        else:
+            end_run()
+            if kind == "A":
+                _, xc, yc, radius, angle1, angle2, negative = op
+                scaled.append(("A", xc * scale, yc * scale, radius * scale, angle1, angle2, negative))
+            else:
+                scaled.append(op)
+    end_run()
+    return scaled
+
+
+class RecordingSurface:
+    """A surface that keeps the shapes drawn on it, in device space.
+
+    Draw on it with an SvgContext, or a Drawing with backend="record".  The
+    recording can then be scaled, cut down to a region, and replayed onto
+    other drawings with `Drawing.replay`.
+
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.shapes = []
+
+    def stroke(self, path, style):
+        pad = style.width / 2
+        if style.join == "miter":
+            pad *= 2 * MITER_REACH
+        self.shapes.append(Shape("stroke", style, split_subpaths(path, pad)))
+
+    def fill(self, path, rgba):
+        self.shapes.append(Shape("fill", rgba, split_subpaths(path, 0)))
+
+    def flush(self):
+        pass
+
+    def finish(self):
+        pass
+
+    def scaled(self, scale, tolerance=0):
+        """A new recording, scaled by `scale`.
+
+        Lines are simplified to within `tolerance` pixels of the new scale.
+
+        """
+        rec = RecordingSurface(math.ceil(self.width * scale), math.ceil(self.height * scale))
+        for shape in self.shapes:
+            style = shape.style
+            if shape.kind == "stroke":
+                style = StrokeStyle(
+                    style.rgba, style.width * scale, style.cap, style.join,
+                    tuple(d * scale for d in style.dashes), style.dash_offset * scale,
+                )
+            subpaths = [
+                (Bounds(*(v * scale for v in bounds)), scale_ops(ops, scale, tolerance))
+                for bounds, ops in shape.subpaths
+            ]
+            rec.shapes.append(Shape(shape.kind, style, subpaths))
+        return rec
+
+    def culled(self, bounds):
+        """A new recording, with only the subpaths that overlap `bounds`."""
+        rec = RecordingSurface(self.width, self.height)
+        for shape in self.shapes:
+            subpaths = [sub for sub in shape.subpaths if sub[0].overlap(bounds)]
+            if subpaths:
+                rec.shapes.append(Shape(shape.kind, shape.style, subpaths))
+        return rec
+
+    def touched_tiles(self, tile_size):
+        """The set of (col, row) square tiles that anything is drawn on."""
+        touched = set()
+        for shape in self.shapes:
+            for bounds, _ in shape.subpaths:
+                touched.update(self._tiles_under(bounds, tile_size))
+        return touched
+
+    def tiled(self, tile_size):
+        """Split into square tiles, in one pass over the subpaths.
+
+        Returns a dict mapping (col, row) to a recording of only the subpaths
+        on that tile, for the tiles that anything is drawn on.
+
+        """
+        tiles = {}
+        for shape in self.shapes:
+            buckets = collections.defaultdict(list)
+            for sub in shape.subpaths:
+                for tile in self._tiles_under(sub[0], tile_size):
+                    buckets[tile].append(sub)
+            for tile, subpaths in buckets.items():
+                rec = tiles.get(tile)
+                if rec is None:
+                    rec = tiles[tile] = RecordingSurface(self.width, self.height)
+                rec.shapes.append(Shape(shape.kind, shape.style, subpaths))
+        return tiles
+
+    def _tiles_under(self, bounds, tile_size):
+        """Produce the (col, row) square tiles that `bounds` is on."""
+        llx, lly, urx, ury = bounds
+        col0 = max(int(llx // tile_size), 0)
+        col1 = min(int(urx // tile_size), math.ceil(self.width / tile_size) - 1)
+        row0 = max(int(lly // tile_size), 0)
+        row1 = min(int(ury // tile_size), math.ceil(self.height / tile_size) - 1)
+        for col in range(col0, col1 + 1):
+            for row in range(row0, row1 + 1):
+                yield col, row
@@ -110,8 +110,14 @@ def set_xing(xings, pt, under=None, over=None):
     return xing
 
 
-def strapify(paths, **strap_kwargs):
-    """Turn paths intro straps."""
+def strapify(paths, grid=None, trim=True, **strap_kwargs):
+    """Turn paths intro straps.
+
+    `grid` is the snapping grid the paths' points are on, if any.  If `trim`
+    is false, the ends of the straps aren't trimmed where they go under
+    other straps, which is faster, but leaves the ends overlapping.
+
+    """
 
     segments = []
     segs_to_paths = {}
@@ -120,7 +126,7 @@ def strapify(paths, **strap_kwargs):
             segments.append(segment)
             segs_to_paths[segment] = path
 
-    points_to_segments = segment_intersections(segments)
+    points_to_segments = segment_intersections(segments, grid=grid)
     isect_points = list(points_to_segments.keys())
 
     segs_to_points = collections.defaultdict(list)
@@ -137,7 +143,11 @@ def strapify(paths, **strap_kwargs):
 
     debug = should_debug("strapify")
     if debug:
-        dbgdwgs = iter(DrawingSequence(name="debugs_", bounds=nice_paths_bounds(paths)))
+        dbgseq = DrawingSequence(
+            name="debugs_", bounds=nice_paths_bounds(paths),
+            background=lambda dwg: dwg.draw_segments(segments, rgb=(0, 0, 0), width=1),
+        )
+        dbgdwgs = iter(dbgseq)
 
     paths_to_do = set(paths)
     paths_done = set()
@@ -150,11 +160,10 @@ def strapify(paths, **strap_kwargs):
         while next_paths:
             previous_path = path
             path = next_paths.pop()
-            closed = (path[0] == path[-1])
+            closed = path.closed
 
             if debug:
                 dwg = next(dbgdwgs)
-                dwg.draw_segments(segments, rgb=(0, 0, 0), width=1)
                 dwg.draw_paths(paths_done, rgb=(0, 0, 0), width=3)
                 dwg.draw_paths(next_paths, rgb=(.7, .7, 0), width=9)
                 if previous_path:
@@ -227,22 +236,24 @@ def strapify(paths, **strap_kwargs):
                 dwg.finish()
                 if dwg.num > 20:
                     print()
+                    dbgseq.close()
                     import sys; sys.exit()
 
     if debug:
         for strap in straps:
             dwg = next(dbgdwgs)
-            dwg.draw_segments(segments, rgb=(0, 0, 0), width=1)
             dwg.draw_path(strap.path, rgb=(1, 0, 0), width=3)
             for s in strap.sides:
                 dwg.draw_path(s, rgb=(0, 0, 1), width=1)
             dwg.finish()
+        dbgseq.close()
 
-    for strap in straps:
-        for end in [0, -1]:
-            xing = xings.get(strap.path[end])
-            if xing is not None and xing.over_piece is not None and xing.over_piece is not strap:
-                trimmers = xing.over_piece.sides
-                strap.sides = [s.trim(end, trimmers) for s in strap.sides]
+    if trim:
+        for strap in straps:
+            for end in [0, -1]:
+                xing = xings.get(strap.path[end])
+                if xing is not None and xing.over_piece is not None and xing.over_piece is not strap:
+                    trimmers = xing.over_piece.sides
+                    strap.sides = [s.trim(end, trimmers) for s in strap.sides]
 
     return straps
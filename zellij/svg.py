@@ -0,0 +1,461 @@
+"""
+Writing SVG directly, without Cairo.
+"""
+
+import collections
+import gzip
+import math
+
+from affine import Affine
+
+from .euclid import Point
+from .path import Path
+
+
+def svg_number(v, precision=3):
+    """Format a number for SVG, with at most `precision` decimal places."""
+    s = f"{v:.{precision}f}"
+    if "." in s:
+        s = s.rstrip("0").rstrip(".")
+    if s == "-0":
+        s = "0"
+    return s
+
+
+def svg_color(rgb):
+    """Format a (r, g, b) color of 0..1 floats for SVG."""
+    return "#" + "".join(f"{round(c * 255):02x}" for c in rgb)
+
+
+def svg_matrix(xform, precision=6):
+    """Format an Affine as an SVG transform."""
+    a, b, c, d, e, f = xform[:6]
+    if (a, b, d, e) == (1, 0, 0, 1):
+        return f"translate({svg_number(c, precision)} {svg_number(f, precision)})"
+    return "matrix({})".format(" ".join(svg_number(v, precision) for v in [a, d, b, e, c, f]))
+
+
+def svg_path_data(paths, precision=3):
+    """The SVG path data ("d" attribute) for a list of Paths."""
+    parts = []
+    for path in paths:
+        points = path.points
+        if path.closed:
+            points = points[:-1]
+        cmd = "M"
+        for x, y in points:
+            parts.append(f"{cmd}{svg_number(x, precision)} {svg_number(y, precision)}")
+            cmd = "L"
+        if path.closed:
+            parts.append("Z")
+    return "".join(parts)
+
+
+def svg_ops_data(ops, precision=3):
+    """The SVG path data for a list of device-space path operations.
+
+    The operations are ("M", x, y), ("L", x, y), ("Z",), and arcs as
+    ("A", xc, yc, radius, angle1, angle2, negative), as made by SvgContext.
+
+    """
+    def num(v):
+        return svg_number(v, precision)
+
+    parts = []
+    for op in ops:
+        kind = op[0]
+        if kind == "A":
+            _, xc, yc, radius, angle1, angle2, negative = op
+            r = num(radius)
+            sweep = 0 if negative else 1
+            # Pieces of no more than half a circle, so the flags are unambiguous.
+            pieces = max(1, math.ceil(abs(angle2 - angle1) / math.pi))
+            for i in range(1, pieces + 1):
+                angle = angle1 + (angle2 - angle1) * i / pieces
+                x, y = xc + radius * math.cos(angle), yc + radius * math.sin(angle)
+                parts.append(f"A{r} {r} 0 0 {sweep} {num(x)} {num(y)}")
+        elif kind == "Z":
+            parts.append("Z")
+        else:
+            parts.append(f"{kind}{num(op[1])} {num(op[2])}")
+    return "".join(parts)
+
+
+def open_svg(name):
+    """Open a text file to write SVG to, compressed if `name` ends with .svgz."""
+    if name.endswith(".svgz"):
+        return gzip.open(name, "wt", encoding="utf-8")
+    return open(name, "w", encoding="utf-8")
+
+
+def svg_header(width, height):
+    """The start of an SVG document, up to the opening <svg> tag."""
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{width}" height="{height}" viewBox="0 0 {width} {height}">\n'
+    )
+
+
+class Matrix(collections.namedtuple("Matrix", "xx yx xy yy x0 y0")):
+    """A transformation matrix, with the same fields as cairo.Matrix."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_affine(cls, xform):
+        a, b, c, d, e, f = xform[:6]
+        return cls(a, d, b, e, c, f)
+
+    def to_affine(self):
+        return Affine(self.xx, self.xy, self.x0, self.yx, self.yy, self.y0)
+
+
+class SvgSurface:
+    """An SVG file written incrementally as shapes are drawn.
+
+    `name` is a file name, or an open text file.  A `.svgz` name writes a
+    gzipped file.  Coordinates are written with `precision` decimal places.
+
+    """
+    def __init__(self, name, width, height, precision=3):
+        self.width = width
+        self.height = height
+        self.precision = precision
+        if isinstance(name, str):
+            self.file = open_svg(name)
+            self.close_file = True
+        else:
+            self.file = name
+            self.close_file = False
+        self.file.write(svg_header(width, height))
+
+    def write_element(self, element):
+        self.file.write(element)
+        self.file.write("\n")
+
+    def stroke(self, path, style):
+        """Write a <path> element stroking `path` with the StrokeStyle `style`."""
+        precision = self.precision
+        attrs = [
+            'fill="none"',
+            f'stroke="{svg_color(style.rgba[:3])}"',
+            f'stroke-width="{svg_number(style.width, precision)}"',
+        ]
+        if style.rgba[3] != 1:
+            attrs.append(f'stroke-opacity="{svg_number(style.rgba[3])}"')
+        if style.cap != "butt":
+            attrs.append(f'stroke-linecap="{style.cap}"')
+        if style.join != "miter":
+            attrs.append(f'stroke-linejoin="{style.join}"')
+        if style.dashes:
+            attrs.append('stroke-dasharray="{}"'.format(
+                " ".join(svg_number(d, precision) for d in style.dashes)
+            ))
+            if style.dash_offset:
+                attrs.append(f'stroke-dashoffset="{svg_number(style.dash_offset, precision)}"')
+        self.write_path(path, attrs)
+
+    def fill(self, path, rgba):
+        """Write a <path> element filling `path` with the color `rgba`."""
+        attrs = [f'fill="{svg_color(rgba[:3])}"']
+        if rgba[3] != 1:
+            attrs.append(f'fill-opacity="{svg_number(rgba[3])}"')
+        self.write_path(path, attrs)
+
+    def write_path(self, path, attrs):
+        d = svg_ops_data(path, self.precision)
+        if d:
+            self.write_element(f'<path d="{d}" {" ".join(attrs)}/>')
+
+    def flush(self):
+        self.file.flush()
+
+    def finish(self):
+        if self.file is not None:
+            self.file.write("</svg>\n")
+            if self.close_file:
+                self.file.close()
+            self.file = None
+
+
+# How to stroke a path, in device units.
+StrokeStyle = collections.namedtuple("StrokeStyle", "rgba width cap join dashes dash_offset")
+
+# The state that save() and restore() keep.
+SvgState = collections.namedtuple(
+    "SvgState", "matrix source line_width dash line_cap line_join antialias"
+)
+
+
+class SvgContext:
+    """Enough of a cairo.Context to draw in pure Python.
+
+    Path coordinates are transformed to device space as they are added, as
+    Cairo does.  Each stroke or fill is passed to the surface's `stroke` or
+    `fill` method: an SvgSurface writes one <path> element for each.
+
+    Line caps and joins are the SVG names, "round", "miter", and so on.
+
+    """
+    def __init__(self, surface):
+        self.surface = surface
+        self.matrix = Affine.identity()
+        self.source = (0, 0, 0, 1)
+        self.line_width = 2.0
+        self.dash = ((), 0)
+        self.line_cap = "butt"
+        self.line_join = "miter"
+        self.antialias = None
+        self.saved_states = []
+        self.path = []
+        self.current_point = None
+        self.subpath_start = None
+
+    # Transformation.
+
+    def get_matrix(self):
+        return Matrix.from_affine(self.matrix)
+
+    def set_matrix(self, matrix):
+        self.matrix = Matrix(*matrix).to_affine()
+
+    def identity_matrix(self):
+        self.matrix = Affine.identity()
+
+    def translate(self, dx, dy):
+        self.matrix *= Affine.translation(dx, dy)
+
+    def rotate(self, radians):
+        self.matrix *= Affine.rotation(math.degrees(radians))
+
+    def scale(self, sx, sy):
+        self.matrix *= Affine.scale(sx, sy)
+
+    def user_to_device(self, x, y):
+        return self.matrix * (x, y)
+
+    def device_to_user(self, x, y):
+        return ~self.matrix * (x, y)
+
+    def user_to_device_distance(self, dx, dy):
+        a, b, _, d, e, _ = self.matrix[:6]
+        return a * dx + b * dy, d * dx + e * dy
+
+    def device_to_user_distance(self, dx, dy):
+        a, b, _, d, e, _ = (~self.matrix)[:6]
+        return a * dx + b * dy, d * dx + e * dy
+
+    def _device_scale(self):
+        """How much lengths grow from user to device space."""
+        return math.sqrt(abs(self.matrix.determinant))
+
+    # State.
+
+    def save(self):
+        self.saved_states.append(SvgState(
+            self.matrix, self.source, self.line_width, self.dash,
+            self.line_cap, self.line_join, self.antialias,
+        ))
+
+    def restore(self):
+        (
+            self.matrix, self.source, self.line_width, self.dash,
+            self.line_cap, self.line_join, self.antialias,
+        ) = self.saved_states.pop()
+
+    def set_source_rgb(self, r, g, b):
+        self.source = (r, g, b, 1)
+
+    def set_source_rgba(self, r, g, b, a):
+        self.source = (r, g, b, a)
+
+    def get_source(self):
+        return self.source
+
+    def set_source(self, source):
+        self.source = source
+
+    def set_line_width(self, width):
+        self.line_width = width
+
+    def get_line_width(self):
+        return self.line_width
+
+    def set_dash(self, dashes, offset=0):
+        self.dash = (tuple(dashes), offset)
+
+    def get_dash(self):
+        return self.dash
+
+    def set_line_cap(self, cap):
+        self.line_cap = cap
+
+    def get_line_cap(self):
+        return self.line_cap
+
+    def set_line_join(self, join):
+        self.line_join = join
+
+    def get_line_join(self):
+        return self.line_join
+
+    def set_antialias(self, antialias):
+        self.antialias = antialias
+
+    def get_antialias(self):
+        return self.antialias
+
+    # Path construction.
+
+    def new_path(self):
+        self.path = []
+        self.current_point = None
+        self.subpath_start = None
+
+    def new_sub_path(self):
+        self.current_point = None
+
+    def move_to(self, x, y):
+        self.path.append(("M", *(self.matrix * (x, y))))
+        self.current_point = self.subpath_start = (x, y)
+
+    def line_to(self, x, y):
+        if self.current_point is None:
+            self.move_to(x, y)
+        else:
+            self.path.append(("L", *(self.matrix * (x, y))))
+            self.current_point = (x, y)
+
+    def rel_line_to(self, dx, dy):
+        x, y = self.current_point
+        self.line_to(x + dx, y + dy)
+
+    def close_path(self):
+        self.path.append(("Z",))
+        self.current_point = self.subpath_start
+
+    def rectangle(self, x, y, width, height):
+        self.move_to(x, y)
+        self.line_to(x + width, y)
+        self.line_to(x + width, y + height)
+        self.line_to(x, y + height)
+        self.close_path()
+
+    def arc(self, xc, yc, radius, angle1, angle2):
+        """Add a circular arc, as cairo.Context.arc does.
+
+        The arc is kept in device space, so the matrix should scale
+        uniformly.
+
+        """
+        while angle2 < angle1:
+            angle2 += 2 * math.pi
+        self._arc(xc, yc, radius, angle1, angle2, False)
+
+    def arc_negative(self, xc, yc, radius, angle1, angle2):
+        """Add a circular arc with decreasing angles."""
+        while angle2 > angle1:
+            angle2 -= 2 * math.pi
+        self._arc(xc, yc, radius, angle1, angle2, True)
+
+    def _arc(self, xc, yc, radius, angle1, angle2, negative):
+        end = (xc + radius * math.cos(angle2), yc + radius * math.sin(angle2))
+        self.line_to(xc + radius * math.cos(angle1), yc + radius * math.sin(angle1))
+
+        # The device angles are turned by the matrix's rotation, and run
+        # backwards if the matrix flips.
+        m = self.matrix
+        turn = math.atan2(m.d, m.a)
+        dxc, dyc = m * (xc, yc)
+        dradius = radius * self._device_scale()
+        if m.determinant > 0:
+            self.path.append(("A", dxc, dyc, dradius, turn + angle1, turn + angle2, negative))
+        else:
+            self.path.append(("A", dxc, dyc, dradius, turn - angle1, turn - angle2, not negative))
+        self.current_point = end
+
+    def copy_path(self):
+        return list(self.path)
+
+    def append_path(self, path):
+        self.path.extend(path)
+
+    # Painting.
+
+    def stroke(self):
+        if self.path:
+            scale = self._device_scale()
+            dashes, offset = self.dash
+            style = StrokeStyle(
+                self.source, self.line_width * scale, self.line_cap, self.line_join,
+                tuple(d * scale for d in dashes), offset * scale,
+            )
+            self.surface.stroke(self.path, style)
+        self.new_path()
+
+    def fill(self):
+        if self.path:
+            self.surface.fill(self.path, self.source)
+        self.new_path()
+
+
+class InstancedSvg:
+    """An SVG image of a tiled design's lines, drawing each shape only once.
+
+    This stands in for a Drawing while a PathTiler tiles a design.  Then
+    `finish` writes the tiler's unit paths once, placed with <use> elements
+    for each orbit element and each lattice cell, so the file size doesn't
+    depend on the number of tiles.
+
+    `transform` is the user-to-device Affine, and `bg` is the background
+    color.  Coordinates are written with `precision` decimal places.
+
+    """
+    def __init__(self, width, height, name, transform=Affine.identity(), bg=None, precision=3):
+        self.width = width
+        self.height = height
+        self.name = name
+        self.transform = transform
+        self.bg = bg
+        self.precision = precision
+
+    def perimeter(self):
+        """The Path of the edges of the image, in user space."""
+        inverse = ~self.transform
+        corners = [(0, 0), (self.width, 0), (self.width, self.height), (0, self.height)]
+        return Path([Point(*(inverse * corner)) for corner in corners])
+
+    def finish(self, tiler, styles):
+        """Write the tiled lines to the file, stroked with (width, color) `styles`."""
+        with open_svg(self.name) as f:
+            self.write(f, tiler, styles)
+
+    def write(self, f, tiler, styles):
+        """Write the tiled lines to the text file `f`."""
+        width, height, precision = self.width, self.height, self.precision
+        f.write(svg_header(width, height))
+        f.write("<defs>\n")
+        f.write(f'<path id="unit" d="{svg_path_data(tiler.unit_paths, precision)}"/>\n')
+        f.write('<g id="cell">\n')
+        for xform in tiler.orbit:
+            f.write(f'<use xlink:href="#unit" transform="{svg_matrix(xform)}"/>\n')
+        f.write("</g>\n")
+        f.write('<g id="tiling">\n')
+        for xform in tiler.cells:
+            f.write(f'<use xlink:href="#cell" transform="{svg_matrix(xform)}"/>\n')
+        f.write("</g>\n")
+        f.write("</defs>\n")
+        if self.bg:
+            f.write(f'<rect width="{width}" height="{height}" fill="{svg_color(self.bg)}"/>\n')
+        f.write(
+            f'<g transform="{svg_matrix(self.transform)}" fill="none" '
+            'stroke-linecap="round" stroke-linejoin="miter">\n'
+        )
+        for line_width, color in styles:
+            f.write(
+                f'<use xlink:href="#tiling" stroke="{svg_color(color)}" '
+                f'stroke-width="{svg_number(line_width, precision)}"/>\n'
+            )
+        f.write("</g>\n")
+        f.write("</svg>\n")